@@ -1,12 +1,154 @@
 from django.contrib import admin
-from .models import Source, Tag, Quote, ModerationLog
+from django.core.paginator import EmptyPage, Paginator
+from django.db import DatabaseError, connection
+from django.db.models import Max, Min, Q
+from django.utils.functional import cached_property
+from .models import Source, Tag, Quote, ModerationLog, ModerationStat, Job, normalize_source_name
+from .search import prefix_range, search_moderation_logs, search_quotes, search_sources
 
 
+# --------- масштабирование changelist'ов ---------
+def estimated_table_rows(model):
+    """Оценка числа строк без COUNT(*): статистика ANALYZE / pg_class, иначе MAX(id)."""
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+                row = cursor.fetchone()
+                if row and row[0] > 0:
+                    return row[0]
+            if connection.vendor == "sqlite":
+                try:
+                    # первое число stat — строк в индексе; у частичных индексов их меньше,
+                    # чем в таблице, поэтому берём максимум по всем индексам
+                    cursor.execute("SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s", [table])
+                    row = cursor.fetchone()
+                    if row and row[0]:
+                        return row[0]
+                except DatabaseError:
+                    pass  # ANALYZE ни разу не запускали — таблицы sqlite_stat1 нет
+            pk = connection.ops.quote_name(model._meta.pk.column)
+            cursor.execute(f"SELECT MAX({pk}) FROM {connection.ops.quote_name(table)}")
+            row = cursor.fetchone()
+            return row[0] if row else None
+    except DatabaseError:
+        return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Точный COUNT(*) только до exact_limit строк (подзапрос с LIMIT).
+    Дальше — оценка: строки таблицы по статистике, для отфильтрованного списка
+    умноженные на долю подходящих строк в выборке по pk (_selectivity). Оценка
+    может ошибаться, поэтому страницы за её пределами не считаются ошибкой.
+    """
+
+    exact_limit = 10000
+    sample_size = 10000
+    sample_windows = 20
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        bounded = qs.order_by()[: self.exact_limit + 1].count()
+        if bounded <= self.exact_limit:
+            return bounded
+        estimate = estimated_table_rows(qs.model)
+        if estimate and qs.query.where:
+            estimate = int(estimate * self._selectivity(qs))
+        return max(estimate or 0, bounded)
+
+    @property
+    def estimated(self):
+        return self.count > self.exact_limit
+
+    def _selectivity(self, qs):
+        """
+        Доля строк, проходящих фильтр: считается в sample_windows окнах по pk,
+        равномерно разнесённых от MIN до MAX(pk), — два COUNT по диапазонам индекса.
+        """
+        model = qs.model
+        bounds = model._default_manager.aggregate(lo=Min("pk"), hi=Max("pk"))
+        if bounds["lo"] is None:
+            return 1.0
+        lo, hi = bounds["lo"], bounds["hi"]
+        width = max(1, self.sample_size // self.sample_windows)
+        step = max(width, (hi - lo + 1) // self.sample_windows)
+        windows = Q()
+        for start in range(lo, hi + 1, step):
+            windows |= Q(pk__range=(start, start + width - 1))
+        sampled = model._default_manager.filter(windows).count()
+        if not sampled:
+            return 1.0
+        return qs.order_by().filter(windows).count() / sampled
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            number = int(number)
+            if number < 1 or not self.estimated:
+                raise
+            return number
+
+    def page(self, number):
+        if not self.estimated:
+            return super().page(number)
+        # без обрезки по оценке: за последней «оценочной» страницей строки ещё могут быть
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+class SourceNameFilter(admin.ListFilter):
+    """Фильтр по префиксу названия источника — поле ввода вместо списка всех источников."""
+
+    title = "источник"
+    parameter_name = "source_name"
+    template = "admin/quotes/source_name_filter.html"
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        value = params.pop(self.parameter_name, None)
+        self.value = (value[-1] if isinstance(value, list) else value or "").strip()
+
+    def has_output(self):
+        return True
+
+    def expected_parameters(self):
+        return [self.parameter_name]
+
+    def queryset(self, request, queryset):
+        if not self.value:
+            return queryset
+        sources = Source.objects.filter(**prefix_range("name_normalized", normalize_source_name(self.value)))
+        return queryset.filter(source__in=sources.values("pk"))
+
+    def choices(self, changelist):
+        hidden = [
+            (k, v) for k, v in changelist.params.items()
+            if k not in (self.parameter_name, "p")
+        ]
+        yield {"value": self.value, "parameter_name": self.parameter_name, "hidden": hidden}
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+# --------- модели ---------
 @admin.register(Source)
-class SourceAdmin(admin.ModelAdmin):
+class SourceAdmin(ScalableAdmin):
     list_display = ("id", "name", "status", "created_by", "created_at", "approved_by", "approved_at", "merged_into")
     list_filter = ("status",)
-    search_fields = ("name", "name_normalized")
+    list_select_related = ("created_by", "approved_by", "merged_into")
+    search_fields = ("name_normalized",)
+    search_help_text = "Начало названия или id."
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_sources(queryset, search_term), False
 
 
 @admin.register(Tag)
@@ -15,17 +157,44 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(Quote)
-class QuoteAdmin(admin.ModelAdmin):
+class QuoteAdmin(ScalableAdmin):
     list_display = ("id", "short_text", "source", "weight", "status", "likes", "views", "author", "created_at")
-    list_filter = ("status", "source")
+    list_filter = ("status", SourceNameFilter)
+    list_select_related = ("source", "author")
     search_fields = ("text",)
+    search_help_text = "Слова из текста (поиск по началу слов) или id."
     autocomplete_fields = ("source", "tags")
 
+    def get_search_results(self, request, queryset, search_term):
+        return search_quotes(queryset, search_term), False
+
     def short_text(self, obj):
         return (obj.text[:80] + "…") if len(obj.text) > 80 else obj.text
 
 
 @admin.register(ModerationLog)
-class ModerationLogAdmin(admin.ModelAdmin):
+class ModerationLogAdmin(ScalableAdmin):
     list_display = ("id", "quote", "moderator", "action", "created_at")
     list_filter = ("action",)
+    list_select_related = ("quote", "moderator")
+    search_fields = ("quote__id",)
+    search_help_text = "Id цитаты или логин модератора."
+    raw_id_fields = ("quote", "moderator")
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_moderation_logs(queryset, search_term), False
+
+
+@admin.register(ModerationStat)
+class ModerationStatAdmin(admin.ModelAdmin):
+    list_display = ("day", "moderator", "action", "count")
+    list_filter = ("action",)
+    list_select_related = ("moderator",)
+    date_hierarchy = "day"
+
+
+@admin.register(Job)
+class JobAdmin(ScalableAdmin):
+    list_display = ("id", "name", "status", "attempts", "run_after", "locked_by", "finished_at")
+    list_filter = ("status", "name")
+    readonly_fields = ("created_at", "finished_at", "locked_at", "locked_by", "last_error")
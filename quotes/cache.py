@@ -0,0 +1,155 @@
+"""
+Cache-aside для сервисных функций.
+
+* ключи версионируются по «пространствам имён» (quotes, sources, tags ...) —
+  счётчикам ResourceVersion в БД, тем же, из которых http_cache строит ETag:
+  bump_resource_version() в любом процессе делает зависящие записи недостижимыми
+  во всех воркерах, даже если у каждого свой locmem;
+* soft TTL: после него запись ещё отдаётся, но пересчитывает её только один
+  воркер — тот, кто первым захватил lock через cache.add (single-flight);
+* счётчики hit/miss/stale/recompute ведутся в процессе, см. cache_stats().
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import wraps
+from typing import Callable, Dict, Iterable, Optional
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .models import ResourceVersion
+
+CACHE_ALIAS = "default"
+KEY_PREFIX = "quotes"
+LOCK_TIMEOUT = 30  # секунд: сколько живёт lock пересчёта, если воркер упал
+WAIT_STEP = 0.05
+_MISSING = object()
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def cache_is_shared() -> bool:
+    """Видят ли другие процессы то, что записал этот (file/database/redis, но не locmem)."""
+    return not isinstance(_cache(), (LocMemCache, DummyCache))
+
+
+def _count(event: str) -> None:
+    with _stats_lock:
+        _stats[event] += 1
+
+
+def cache_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+# --------- версии пространств имён ---------
+def namespace_versions(namespaces: Iterable[str]) -> Dict[str, tuple]:
+    """
+    (version, updated_at) каждого пространства имён. updated_at отличает версию,
+    поднятую в откатившейся транзакции, от той же цифры после следующего изменения.
+    """
+    namespaces = list(namespaces)
+    if not namespaces:
+        return {}
+    found = {
+        name: (version, updated_at)
+        for name, version, updated_at in ResourceVersion.objects
+        .filter(name__in=namespaces)
+        .values_list("name", "version", "updated_at")
+    }
+    return {ns: found.get(ns, (0, None)) for ns in namespaces}
+
+
+# --------- cache-aside ---------
+def _make_key(name: str, versions: Dict[str, tuple], args, kwargs) -> str:
+    raw = repr((sorted(versions.items()), args, sorted(kwargs.items())))
+    digest = hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+    return f"{KEY_PREFIX}:{name}:{digest}"
+
+
+def get_or_compute(
+    key: str,
+    compute: Callable[[], object],
+    soft_ttl: int,
+    hard_ttl: Optional[int] = None,
+    wait: float = 2.0,
+):
+    """
+    Достаёт значение из кэша или считает его.
+
+    Запись хранится как (value, soft_expires_at) с реальным таймаутом hard_ttl.
+    Пока запись «свежая» — hit. После soft_ttl её пересчитывает владелец lock'а,
+    остальные получают старое значение (stale). Если записи нет вовсе, не-владельцы
+    lock'а ждут до `wait` секунд и только потом считают сами.
+    """
+    cache = _cache()
+    hard_ttl = hard_ttl if hard_ttl is not None else soft_ttl * 10
+    lock_key = f"{key}:lock"
+
+    entry = cache.get(key, _MISSING)
+    now = time.time()
+    if entry is not _MISSING:
+        value, soft_expires_at = entry
+        if now < soft_expires_at:
+            _count("hit")
+            return value
+        if not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+            _count("stale")
+            return value
+    else:
+        _count("miss")
+        if not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+            deadline = now + wait
+            while time.time() < deadline:
+                time.sleep(WAIT_STEP)
+                entry = cache.get(key, _MISSING)
+                if entry is not _MISSING:
+                    _count("waited")
+                    return entry[0]
+            # владелец lock'а не успел — считаем сами, но lock не трогаем
+            _count("recompute")
+            return compute()
+
+    try:
+        _count("recompute")
+        value = compute()
+        cache.set(key, (value, time.time() + soft_ttl), timeout=hard_ttl)
+        return value
+    finally:
+        cache.delete(lock_key)
+
+
+def cached(name: str, soft_ttl: int = 60, hard_ttl: Optional[int] = None, namespaces: Iterable[str] = ()):
+    """
+    Декоратор cache-aside для сервисной функции.
+
+    Аргументы функции входят в ключ (должны иметь стабильный repr), а версии
+    `namespaces` — в его префикс. Результат должен сериализоваться pickle'ом,
+    поэтому QuerySet'ы нужно материализовать до возврата.
+    """
+    namespaces = tuple(namespaces)
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = _make_key(name, namespace_versions(namespaces), args, kwargs)
+            return get_or_compute(key, lambda: func(*args, **kwargs), soft_ttl=soft_ttl, hard_ttl=hard_ttl)
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
@@ -1,11 +1,21 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
 from .models import Quote, Tag
 from .services import get_or_create_source_by_name
 
 class QuoteCreateForm(forms.ModelForm):
     """Форма для обычных пользователей"""
-    source_name = forms.CharField(label="Источник (фильм/книга/автор)", max_length=255)
+    source_name = forms.CharField(
+        label="Источник (фильм/книга/автор)",
+        max_length=255,
+        # подсказки утверждённых источников (quotes/js/source_typeahead.js) — меньше дублей на модерации
+        widget=forms.TextInput(attrs={
+            "list": "source-suggestions",
+            "autocomplete": "off",
+            "data-suggest-url": reverse_lazy("quotes:source_suggest"),
+        }),
+    )
 
     class Meta:
         model = Quote
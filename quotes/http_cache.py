@@ -0,0 +1,67 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .services import resource_versions
+
+DEFAULT_CACHE_CONTROL = {"private": True, "no_cache": True}
+
+
+def cache_control_for(endpoint: str, request) -> dict:
+    """Политика Cache-Control для эндпоинта из settings.QUOTES_CACHE_CONTROL."""
+    policies = getattr(settings, "QUOTES_CACHE_CONTROL", {})
+    policy = dict(policies.get(endpoint, policies.get("default", DEFAULT_CACHE_CONTROL)))
+    # страницы авторизованных пользователей персональные — общим кэшам их отдавать нельзя
+    if request.user.is_authenticated:
+        policy.pop("public", None)
+        policy["private"] = True
+    return policy
+
+
+def conditional_page(endpoint: str, *resources: str):
+    """
+    Отвечает 304 на If-None-Match / If-Modified-Since ещё до вызова view.
+
+    Версия страницы — счётчики ResourceVersion перечисленных ресурсов (один
+    маленький запрос), плюс пользователь и CSRF-секрет: разметка для гостя,
+    для конкретного пользователя и со старым csrf-токеном не должна совпадать.
+    """
+
+    def _state(request):
+        if not hasattr(request, "_resource_state"):
+            request._resource_state = resource_versions(resources)
+        return request._resource_state
+
+    def etag_func(request, *args, **kwargs):
+        state = _state(request)
+        versions = ",".join(f"{name}:{state.get(name, (0, None))[0]}" for name in resources)
+        csrf_secret = request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")
+        raw = f"{endpoint}|{request.get_full_path()}|{versions}|{request.user.pk or 0}|{csrf_secret}"
+        return hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+    def last_modified_func(request, *args, **kwargs):
+        stamps = [updated_at for _, updated_at in _state(request).values()]
+        return max(stamps) if stamps else None
+
+    def decorator(view):
+        conditioned = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            # с непоказанными flash-сообщениями 304 спрятал бы их — рендерим страницу целиком
+            if len(get_messages(request)):
+                response = view(request, *args, **kwargs)
+            else:
+                response = conditioned(request, *args, **kwargs)
+            if request.method in ("GET", "HEAD"):
+                patch_cache_control(response, **cache_control_for(endpoint, request))
+                patch_vary_headers(response, ("Cookie",))
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,168 @@
+"""
+Лёгкая очередь фоновых задач поверх таблицы Job.
+
+    @job("warm_caches")
+    def warm_caches(payload): ...
+
+    enqueue_on_commit("warm_caches", dedupe_key="warm_caches")
+
+Задачи с одинаковым dedupe_key, пока ждут выполнения, схлопываются в одну.
+Выполняет их `manage.py run_workers`; упавшая задача (и задача, чей процесс
+пропал) повторяется с экспоненциальной задержкой до max_attempts раз.
+"""
+import logging
+import traceback
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 10  # секунд; задержка попытки n — RETRY_BASE_DELAY * 2**(n-1)
+
+_registry: Dict[str, Callable[[dict], None]] = {}
+
+
+def job(name: str):
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def registered_jobs() -> Dict[str, Callable[[dict], None]]:
+    return dict(_registry)
+
+
+# --------- постановка ---------
+def enqueue(
+    name: str,
+    payload: Optional[dict] = None,
+    dedupe_key: Optional[str] = None,
+    delay: int = 0,
+    max_attempts: int = 5,
+) -> Optional[Job]:
+    """
+    Ставит задачу в очередь. Если задача с тем же dedupe_key уже ждёт —
+    новая не создаётся (возвращается None).
+    """
+    if name not in _registry:
+        raise ValueError(f"Неизвестная задача: {name}")
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                payload=payload or {},
+                dedupe_key=dedupe_key,
+                run_after=timezone.now() + timedelta(seconds=delay),
+                max_attempts=max_attempts,
+            )
+    except IntegrityError:
+        if dedupe_key is None:
+            raise
+        return None
+
+
+def enqueue_on_commit(name: str, **kwargs) -> None:
+    """Ставит задачу только после успешного коммита текущей транзакции."""
+    transaction.on_commit(lambda: enqueue(name, **kwargs))
+
+
+# --------- выполнение ---------
+def claim_jobs(worker_id: str, limit: int) -> List[int]:
+    """
+    Забирает до `limit` готовых задач. Захват — условный UPDATE по статусу,
+    поэтому одну задачу не заберут два воркера и без SELECT ... FOR UPDATE.
+    Попытка засчитывается при захвате: если процесс умрёт, она не потеряется.
+    dedupe_key остаётся: уникален он только среди queued, так что новая такая же
+    задача на время выполнения ставится, а повтор упавшей снова схлопывается.
+    """
+    now = timezone.now()
+    candidates = list(
+        Job.objects.filter(status=Job.Status.QUEUED, run_after__lte=now)
+        .order_by("run_after", "id")
+        .values_list("id", flat=True)[:limit]
+    )
+    claimed = []
+    for job_id in candidates:
+        taken = Job.objects.filter(pk=job_id, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING, locked_by=worker_id, locked_at=now, attempts=F("attempts") + 1,
+        )
+        if taken:
+            claimed.append(job_id)
+    return claimed
+
+
+def requeue_stale(timeout: int) -> int:
+    """
+    Задачи, чей воркер пропал (running дольше timeout секунд), — как упавшие:
+    повтор с задержкой или failed после max_attempts. Возвращает число возвращённых в очередь.
+    """
+    stale = Job.objects.filter(
+        status=Job.Status.RUNNING, locked_at__lt=timezone.now() - timedelta(seconds=timeout)
+    )
+    requeued = 0
+    for item in stale:
+        _retry_or_fail(item, f"Воркер {item.locked_by} пропал, не завершив задачу.")
+        requeued += item.status == Job.Status.QUEUED
+    return requeued
+
+
+def release_lost_jobs(job_ids: Iterable[int], error: str) -> int:
+    """
+    Задачи, чей процесс пула умер у нас на глазах, — как упавшие, сразу, не дожидаясь
+    requeue_stale. Уже завершённые не трогает. Возвращает число возвращённых в очередь.
+    """
+    requeued = 0
+    for item in Job.objects.filter(pk__in=list(job_ids), status=Job.Status.RUNNING):
+        _retry_or_fail(item, error)
+        requeued += item.status == Job.Status.QUEUED
+    return requeued
+
+
+def _retry_or_fail(item: Job, error: str) -> None:
+    """Неудачная попытка: обратно в очередь с задержкой или failed, если попытки кончились."""
+    now = timezone.now()
+    item.last_error = error
+    item.locked_by, item.locked_at = "", None
+    if item.attempts < item.max_attempts:
+        item.status = Job.Status.QUEUED
+        item.run_after = now + timedelta(seconds=RETRY_BASE_DELAY * 2 ** (item.attempts - 1))
+    else:
+        item.status = Job.Status.FAILED
+        item.finished_at = now
+    fields = ["status", "run_after", "finished_at", "last_error", "locked_by", "locked_at"]
+    try:
+        with transaction.atomic():
+            item.save(update_fields=fields)
+    except IntegrityError:
+        # пока задача выполнялась, такую же поставили заново — она и сделает работу
+        item.status = Job.Status.FAILED
+        item.finished_at = now
+        item.last_error += "\nПовтор не поставлен: в очереди уже есть задача с тем же dedupe_key."
+        item.save(update_fields=fields)
+
+
+def run_job(job_id: int) -> str:
+    """Выполняет захваченную задачу и записывает результат. Возвращает итоговый статус."""
+    item = Job.objects.get(pk=job_id)
+    handler = _registry.get(item.name)
+    try:
+        if handler is None:
+            raise LookupError(f"Неизвестная задача: {item.name}")
+        handler(item.payload)
+    except Exception:
+        logger.exception("Задача %s упала (попытка %s/%s)", item, item.attempts, item.max_attempts)
+        _retry_or_fail(item, traceback.format_exc())
+        return item.status
+    item.status = Job.Status.DONE
+    item.finished_at = timezone.now()
+    item.last_error = ""
+    item.locked_by, item.locked_at = "", None
+    item.save(update_fields=["status", "finished_at", "last_error", "locked_by", "locked_at"])
+    return item.status
@@ -0,0 +1,104 @@
+import gzip
+import itertools
+import json
+import os
+import time
+from datetime import datetime, time as dt_time, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from quotes.models import ModerationLog
+from quotes.services import rollup_moderation_logs
+
+FIELDS = ("id", "quote_id", "moderator_id", "action", "reason", "created_at")
+
+
+def open_archive(out_dir: Path, cutoff):
+    """Новый файл архива (path, file); существующий не перезаписывается — в нём строки, которых в БД уже нет."""
+    stem = f"moderation_logs_before_{cutoff:%Y%m%d}_{timezone.now():%Y%m%d%H%M%S}"
+    for n in itertools.count():
+        path = out_dir / (f"{stem}.jsonl.gz" if not n else f"{stem}_{n}.jsonl.gz")
+        try:
+            return path, open(path, "xb")
+        except FileExistsError:
+            continue
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит строки ModerationLog старше срока хранения в сжатый JSONL и удаляет их "
+        "небольшими пачками — каждая в своей короткой транзакции. Перед удалением пачка "
+        "добавляется в дневную свёртку ModerationStat."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=getattr(settings, "QUOTES_MODERATION_LOG_RETENTION_DAYS", 180),
+            help="Срок хранения в днях (по умолчанию QUOTES_MODERATION_LOG_RETENTION_DAYS).",
+        )
+        parser.add_argument("--before", help="Явная граница YYYY-MM-DD вместо --days.")
+        parser.add_argument(
+            "--output-dir", default=getattr(settings, "QUOTES_ARCHIVE_DIR", settings.BASE_DIR / "archive"),
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause", type=float, default=0.05,
+            help="Пауза между пачками (сек), чтобы не держать SQLite занятой подряд.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Только посчитать строки.")
+
+    def handle(self, *args, **options):
+        if options["before"]:
+            day = parse_date(options["before"])
+            if day is None:
+                raise CommandError("--before ожидает дату в формате YYYY-MM-DD")
+            cutoff = timezone.make_aware(datetime.combine(day, dt_time.min))
+        else:
+            cutoff = timezone.now() - timedelta(days=options["days"])
+
+        old = ModerationLog.objects.filter(created_at__lt=cutoff)
+        if options["dry_run"]:
+            self.stdout.write(f"К архивации: {old.count()} строк старше {cutoff:%Y-%m-%d %H:%M}.")
+            return
+
+        out_dir = Path(options["output_dir"])
+        out_dir.mkdir(parents=True, exist_ok=True)
+        path, raw = open_archive(out_dir, cutoff)
+
+        total, last_id = 0, 0
+        with raw, gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+            while True:
+                # keyset-пагинация по id: каждая пачка — индексный диапазон, без OFFSET
+                rows = list(
+                    old.filter(id__gt=last_id).order_by("id").values(*FIELDS)[: options["batch_size"]]
+                )
+                if not rows:
+                    break
+                archive.write("".join(
+                    json.dumps({**row, "created_at": row["created_at"].isoformat()}, ensure_ascii=False) + "\n"
+                    for row in rows
+                ).encode("utf-8"))
+                # строки должны оказаться на диске до того, как исчезнут из БД
+                archive.flush()
+                os.fsync(raw.fileno())
+
+                ids = [row["id"] for row in rows]
+                with transaction.atomic():
+                    rollup_moderation_logs(rows)
+                    ModerationLog.objects.filter(id__in=ids).delete()
+
+                total += len(rows)
+                last_id = ids[-1]
+                if options["pause"]:
+                    time.sleep(options["pause"])
+
+        if not total:
+            path.unlink()
+            self.stdout.write("Нечего архивировать.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Архивировано {total} строк в {path}."))
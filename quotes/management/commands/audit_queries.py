@@ -0,0 +1,125 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from quotes.models import Job, ModerationLog, Quote, Source, Tag
+from quotes.services import approved_quotes_qs, top_quotes
+
+User = get_user_model()
+
+
+def audited_queries():
+    """
+    (метка, QuerySet) — запросы, которые выполняют services и views.
+    Параметры берутся из текущей БД, чтобы план совпадал с реальным.
+    """
+    any_tag = Tag.objects.values_list("id", flat=True).first() or 1
+    any_source = Source.objects.values_list("id", flat=True).first() or 1
+    some_ids = list(approved_quotes_qs().values_list("id", flat=True)[:10]) or [1]
+    tags_through = Quote.tags.through
+    return [
+        ("services.approved_quote_weights", approved_quotes_qs().order_by().values_list("id", "weight")),
+        ("services.random_quotes (IN)", approved_quotes_qs().filter(id__in=some_ids).order_by()),
+        ("prefetch tags (IN)", tags_through.objects.filter(quote_id__in=some_ids).select_related("tag")),
+        ("services.top_quotes", top_quotes(10)),
+        ("services.top_quotes(tag)", top_quotes(10, tag_id=any_tag)),
+        ("services.get_or_create_source_by_name", Source.objects.filter(name_normalized="название")[:1]),
+        ("snapshot.build_snapshot", approved_quotes_qs().order_by("id")),
+        ("Quote.clean: approved per source", Quote.objects.filter(
+            source_id=any_source, status=Quote.Status.APPROVED).exclude(pk=0).order_by().values("pk")),
+        ("views_moderation.queue: drafts", Quote.objects.select_related("source", "author")
+            .filter(status=Quote.Status.DRAFT)),
+        ("views_moderation.queue: pending sources", Source.objects.filter(status=Source.Status.PENDING)),
+        ("views_moderation.queue: approved source names", Source.objects.filter(
+            status=Source.Status.APPROVED).only("name").order_by("name")),
+        ("views_moderation.users: quotes", Quote.objects.select_related("author", "source")
+            .only("id", "author_id", "text", "status", "created_at", "source_id").order_by("-created_at")),
+        ("views_moderation.users: users", User.objects.all().order_by("-date_joined")),
+        ("admin: quote changelist", Quote.objects.select_related("source", "author").order_by("-created_at", "-pk")[:100]),
+        ("admin: moderation log changelist", ModerationLog.objects.select_related("quote", "moderator")
+            .order_by("-created_at", "-pk")[:100]),
+        ("archive_moderation_logs: batch", ModerationLog.objects.filter(
+            created_at__lt=timezone.now(), id__gt=0).order_by("id").values("id")[:1000]),
+        ("services.moderator_action_counts: live", ModerationLog.objects.values("moderator_id", "action")
+            .annotate(n=Count("id")).order_by()),
+        ("jobs.claim_jobs", Job.objects.filter(status=Job.Status.QUEUED, run_after__lte=timezone.now())
+            .order_by("run_after", "id").values_list("id", flat=True)[:10]),
+    ]
+
+
+def explain(qs):
+    """Строки EXPLAIN QUERY PLAN в виде дерева: [(глубина, текст)]."""
+    sql, params = qs.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        rows = cursor.fetchall()
+    depth = {0: -1}
+    out = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        out.append((depth[node_id], detail))
+    return out
+
+
+def problems(plan):
+    found = []
+    for _, detail in plan:
+        if detail.startswith("SCAN ") and " USING " not in detail:
+            found.append(f"полный проход: {detail}")
+        if "USE TEMP B-TREE" in detail:
+            found.append(f"временное B-дерево: {detail}")
+    return found
+
+
+def bench(qs, repeat):
+    """Медиана времени самого SQL (мс), без сборки моделей и prefetch."""
+    sql, params = qs.query.sql_with_params()
+    timings = []
+    with connection.cursor() as cursor:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN QUERY PLAN для каждого ORM-запроса из services и views; отмечает полные "
+        "проходы по таблицам и временные B-деревья для сортировки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bench", type=int, default=0, help="Выполнить каждый запрос N раз и показать медиану.")
+        parser.add_argument("--only-problems", action="store_true", help="Показывать только запросы с замечаниями.")
+        parser.add_argument("--strict", action="store_true", help="Код выхода 1, если есть замечания.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Аудит разбирает вывод EXPLAIN QUERY PLAN SQLite.")
+
+        flagged = 0
+        for label, qs in audited_queries():
+            plan = explain(qs)
+            found = problems(plan)
+            flagged += bool(found)
+            if options["only_problems"] and not found:
+                continue
+
+            timing = f"  {bench(qs, options['bench']):.2f} мс" if options["bench"] else ""
+            style = self.style.WARNING if found else self.style.SUCCESS
+            self.stdout.write(style(f"{'!!' if found else 'ok'} {label}{timing}"))
+            for depth, detail in plan:
+                self.stdout.write(f"     {'  ' * depth}{detail}")
+            for problem in found:
+                self.stdout.write(self.style.WARNING(f"     -> {problem}"))
+
+        self.stdout.write(f"\nЗапросов с замечаниями: {flagged}.")
+        if options["strict"] and flagged:
+            raise CommandError("Есть запросы с полным проходом или временным B-деревом.")
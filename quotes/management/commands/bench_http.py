@@ -0,0 +1,53 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.templatetags.static import static
+from django.test import Client
+
+ENCODINGS = ("identity", "gzip", "br")
+
+
+class Command(BaseCommand):
+    help = (
+        "Размер ответа «по проводу» и время до первого байта для страниц и статики "
+        "при разных Accept-Encoding. Запросы идут в процессе, через весь стек middleware."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", help="URL-пути (по умолчанию /top/ и base.css)")
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or ["/top/", static("quotes/css/base.css")]
+        host = next((h for h in settings.ALLOWED_HOSTS if h != "*" and not h.startswith(".")), "localhost")
+        client = Client(SERVER_NAME=host)
+
+        self.stdout.write(f"{'path':<40} {'encoding':<12} {'status':>6} {'bytes':>8} {'ttfb p50':>10} {'ttfb p95':>10}")
+        for path in paths:
+            for encoding in ENCODINGS:
+                sizes, timings, status, got = [], [], None, "-"
+                for _ in range(options["repeat"]):
+                    started = time.perf_counter()
+                    response = client.get(path, HTTP_ACCEPT_ENCODING=encoding)
+                    body = iter(response.streaming_content) if response.streaming else iter([response.content])
+                    first = next(body, b"")
+                    timings.append(time.perf_counter() - started)
+                    rest = b"".join(body)
+                    if response.streaming:
+                        response.close()
+                    headers = sum(len(k) + len(v) + 4 for k, v in response.items())
+                    sizes.append(len(first) + len(rest) + headers)
+                    status = response.status_code
+                    got = response.get("Content-Encoding", "identity")
+                label = encoding if got == encoding else f"{encoding}>{got}"
+                self.stdout.write(
+                    f"{path:<40} {label:<12} {status:>6} {int(statistics.median(sizes)):>8} "
+                    f"{statistics.median(timings) * 1000:>8.2f}ms {_p95(timings) * 1000:>8.2f}ms"
+                )
+
+
+def _p95(values):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from quotes.snapshot import build_snapshot, snapshot_path
+
+
+class Command(BaseCommand):
+    help = "Пересобирает файл-снимок утверждённых цитат (QUOTES_SNAPSHOT_PATH) для главной."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", help="Куда записать снимок (по умолчанию QUOTES_SNAPSHOT_PATH).")
+
+    def handle(self, *args, **options):
+        path = options["path"] or snapshot_path()
+        count = build_snapshot(path)
+        self.stdout.write(self.style.SUCCESS(f"Снимок: {count} цитат, {path}."))
@@ -0,0 +1,350 @@
+import http.cookiejar
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urlsplit
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import Resolver404, resolve
+
+from .seed_demo import PASSWORD
+
+DEFAULT_MIX = "home=40,top=12,top_tag=10,random=5,react=15,add=8,moderate=10"
+LOCKED = "database is locked"
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    # редирект после POST — часть ответа, а не ещё один запрос
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Session:
+    """HTTP-клиент с cookie (сессия, csrftoken), один на «пользователя» в потоке."""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.jar = http.cookiejar.CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.jar), _NoRedirect)
+
+    def csrf(self):
+        return next((c.value for c in self.jar if c.name == settings.CSRF_COOKIE_NAME), "")
+
+    def request(self, path, data=None):
+        """(status, тело, секунды). status 0 — соединение не удалось или таймаут."""
+        body = None
+        if data is not None:
+            body = urlencode({**data, "csrfmiddlewaretoken": self.csrf()}, doseq=True).encode()
+        req = Request(self.base_url + path, data=body)
+        started = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                payload = resp.read()
+                status = resp.status
+        except HTTPError as e:
+            payload, status = e.read(), e.code
+        except (URLError, OSError):
+            payload, status = b"", 0
+        return status, payload, time.perf_counter() - started
+
+    def login(self, username):
+        self.request("/login/")
+        status, _, _ = self.request("/login/", {"username": username, "password": PASSWORD})
+        if status != 302:
+            raise CommandError(f"Не удалось войти как {username} (HTTP {status}).")
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, status, seconds):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест всего стека: поднимает приложение на временной засеянной SQLite, "
+        "гоняет смесь запросов N параллельными клиентами и печатает по эндпоинтам quotes/urls.py "
+        "пропускную способность, перцентили задержки, ошибки и «database is locked»."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=8)
+        parser.add_argument("--duration", type=float, default=30.0, help="Секунд нагрузки.")
+        parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Веса действий (по умолчанию {DEFAULT_MIX}).")
+        parser.add_argument("--timeout", type=float, default=30.0, help="Таймаут одного запроса (сек).")
+        parser.add_argument("--server", choices=("runserver", "gunicorn"), default="runserver")
+        parser.add_argument("--workers", type=int, default=4, help="Процессов gunicorn.")
+        parser.add_argument("--quotes", type=int, default=2000)
+        parser.add_argument("--drafts", type=int, default=500)
+        parser.add_argument("--snapshot", action="store_true", help="Собрать снимок каталога перед стартом.")
+        parser.add_argument("--url", help="Уже запущенный сервер (с данными seed_demo) — ничего не поднимать.")
+        parser.add_argument("--keep", action="store_true", help="Не удалять временный каталог с БД и логом.")
+        parser.add_argument("--json", help="Сохранить результаты в JSON-файл.")
+
+    def handle(self, *args, **options):
+        mix = self.parse_mix(options["mix"])
+        workdir = server = log_path = None
+        try:
+            if options["url"]:
+                base_url = options["url"].rstrip("/")
+            else:
+                workdir = Path(tempfile.mkdtemp(prefix="quotes-loadtest-"))
+                env = self.prepare(workdir, options)
+                base_url, server, log_path = self.start_server(workdir, env, options)
+
+            world = self.discover(base_url, options["timeout"])
+            stats = Stats()
+            started = time.perf_counter()
+            deadline = started + options["duration"]
+            threads = [
+                threading.Thread(target=self.client_loop, args=(i, base_url, mix, world, stats, deadline, options))
+                for i in range(options["clients"])
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            if server is not None:
+                server.terminate()
+                try:
+                    server.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+
+        locked = self.count_locked(log_path) if log_path else {}
+        self.report(stats, locked, elapsed, options)
+
+        if workdir is not None:
+            if options["keep"]:
+                self.stdout.write(f"Данные прогона: {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    # --------- подготовка ---------
+    @staticmethod
+    def parse_mix(raw):
+        mix = {}
+        for part in raw.split(","):
+            name, _, weight = part.partition("=")
+            name = name.strip()
+            if name not in ACTIONS or not weight.strip().isdigit():
+                raise CommandError(f"Неверный элемент --mix: {part!r}. Действия: {', '.join(ACTIONS)}")
+            mix[name] = int(weight)
+        return mix
+
+    def prepare(self, workdir, options):
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "testproject.settings"),
+            "DJANGO_DB_PATH": str(workdir / "db.sqlite3"),
+            "DJANGO_ALLOWED_HOSTS": "127.0.0.1,localhost",
+            "DJANGO_DEBUG": "False",
+            "QUOTES_SNAPSHOT_PATH": str(workdir / "catalogue.snap"),
+            "QUOTES_ARCHIVE_DIR": str(workdir / "archive"),
+        }
+        manage = [sys.executable, str(settings.BASE_DIR / "manage.py")]
+        self.stdout.write(f"Засеваем БД в {workdir}…")
+        steps = [
+            ["migrate", "--noinput", "-v", "0"],
+            ["seed_demo", "--quotes", str(options["quotes"]), "--drafts", str(options["drafts"])],
+        ]
+        if options["snapshot"]:
+            steps.append(["build_snapshot"])
+        for step in steps:
+            subprocess.run(manage + step, env=env, check=True, stdout=subprocess.DEVNULL)
+        return env
+
+    def start_server(self, workdir, env, options):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        if options["server"] == "gunicorn":
+            cmd = [
+                sys.executable, "-m", "gunicorn", "testproject.wsgi:application",
+                "-b", f"127.0.0.1:{port}", "-w", str(options["workers"]),
+            ]
+        else:
+            cmd = [sys.executable, str(settings.BASE_DIR / "manage.py"), "runserver", f"127.0.0.1:{port}", "--noreload"]
+        log_path = workdir / "server.log"
+        log = open(log_path, "wb")
+        server = subprocess.Popen(cmd, env=env, cwd=settings.BASE_DIR, stdout=log, stderr=subprocess.STDOUT)
+        log.close()
+
+        base_url = f"http://127.0.0.1:{port}"
+        probe = Session(base_url, timeout=2)
+        for _ in range(150):
+            if server.poll() is not None:
+                raise CommandError(f"Сервер завершился с кодом {server.returncode}, см. {log_path}")
+            if probe.request("/random/?n=1")[0] == 200:
+                self.stdout.write(f"{options['server']} слушает {base_url}")
+                return base_url, server, log_path
+            time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f"Сервер не ответил за 30 секунд, см. {log_path}")
+
+    def discover(self, base_url, timeout):
+        """Идентификаторы, из которых строятся запросы: теги, утверждённые цитаты, черновики."""
+        anon = Session(base_url, timeout)
+        _, top, _ = anon.request("/top/")
+        _, feed, _ = anon.request("/random/?n=50")
+        mod = Session(base_url, timeout)
+        mod.login("loadmod")
+        _, queue, _ = mod.request("/moderation/queue/")
+        world = {
+            "tags": [int(x) for x in re.findall(rb'<option value="(\d+)"', top)],
+            "quotes": [q["id"] for q in json.loads(feed)["quotes"]],
+            "drafts": [int(x) for x in re.findall(rb"/moderation/quotes/(\d+)/approve/", queue)],
+            "lock": threading.Lock(),
+        }
+        if not world["tags"] or not world["quotes"]:
+            raise CommandError("В БД нет тегов или утверждённых цитат — засейте её через seed_demo.")
+        return world
+
+    # --------- нагрузка ---------
+    def client_loop(self, index, base_url, mix, world, stats, deadline, options):
+        rng = random.Random(index)
+        sessions = {}
+
+        def session(kind):
+            if kind not in sessions:
+                s = Session(base_url, options["timeout"])
+                if kind == "user":
+                    s.login(f"loaduser{index % 20}")
+                elif kind == "moderator":
+                    s.login("loadmod")
+                else:
+                    s.request("/quote/")  # получить csrftoken до первого POST
+                sessions[kind] = s
+            return sessions[kind]
+
+        names, weights = list(mix), list(mix.values())
+        while time.perf_counter() < deadline:
+            action = rng.choices(names, weights=weights, k=1)[0]
+            request = ACTIONS[action](rng, world)
+            if request is None:
+                continue
+            kind, path, data = request
+            status, _, seconds = session(kind).request(path, data)
+            stats.record(endpoint_name(path), status, seconds)
+
+    # --------- отчёт ---------
+    @staticmethod
+    def count_locked(log_path):
+        """Считает «database is locked» в трейсбеках django.request из лога сервера, по эндпоинтам."""
+        locked = defaultdict(int)
+        current = None
+        with open(log_path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                m = re.search(r"Internal Server Error: (\S+)", line)
+                if m:
+                    current = endpoint_name(m.group(1))
+                elif LOCKED in line and current is not None:
+                    locked[current] += 1
+                    current = None
+        return locked
+
+    def report(self, stats, locked, elapsed, options):
+        rows = []
+        for endpoint in sorted(stats.latencies):
+            lat = sorted(stats.latencies[endpoint])
+            statuses = stats.statuses[endpoint]
+            errors = sum(n for code, n in statuses.items() if code == 0 or code >= 500)
+            rows.append({
+                "endpoint": endpoint,
+                "requests": len(lat),
+                "rps": len(lat) / elapsed,
+                "errors": errors,
+                "error_rate": errors / len(lat),
+                "locked": locked.get(endpoint, 0),
+                "p50_ms": percentile(lat, 50) * 1000,
+                "p90_ms": percentile(lat, 90) * 1000,
+                "p99_ms": percentile(lat, 99) * 1000,
+                "max_ms": lat[-1] * 1000,
+                "statuses": dict(sorted(statuses.items())),
+            })
+
+        total = sum(r["requests"] for r in rows)
+        self.stdout.write(
+            f"\n{options['clients']} клиентов, {elapsed:.1f} с, {total} запросов, {total / elapsed:.1f} req/s\n"
+        )
+        self.stdout.write(
+            f"{'endpoint':<36} {'req':>6} {'req/s':>7} {'err%':>6} {'locked':>6} "
+            f"{'p50ms':>8} {'p90ms':>8} {'p99ms':>8} {'maxms':>8}"
+        )
+        for r in rows:
+            self.stdout.write(
+                f"{r['endpoint']:<36} {r['requests']:>6} {r['rps']:>7.1f} {r['error_rate'] * 100:>5.1f}% "
+                f"{r['locked']:>6} {r['p50_ms']:>8.1f} {r['p90_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}"
+            )
+        if options["json"]:
+            with open(options["json"], "w", encoding="utf-8") as f:
+                json.dump({"elapsed": elapsed, "clients": options["clients"], "endpoints": rows}, f, indent=2)
+
+
+def endpoint_name(path):
+    try:
+        return resolve(urlsplit(path).path).view_name
+    except Resolver404:
+        return path
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+# --------- смесь запросов: действие -> (сессия, путь, POST-данные | None) ---------
+def _pop_draft(world):
+    with world["lock"]:
+        return world["drafts"].pop() if world["drafts"] else None
+
+
+def _moderate(rng, world):
+    pk = _pop_draft(world)
+    if pk is None:
+        return None
+    if rng.random() < 0.7:
+        return "moderator", f"/moderation/quotes/{pk}/approve/", {
+            f"q{pk}-weight": rng.randint(1, 10),
+            f"q{pk}-tags": rng.sample(world["tags"], 1),
+        }
+    return "moderator", f"/moderation/quotes/{pk}/reject/", {"reason": "loadtest"}
+
+
+ACTIONS = {
+    "home": lambda rng, world: ("anon", "/quote/", None),
+    "top": lambda rng, world: ("anon", "/top/", None),
+    "top_tag": lambda rng, world: ("anon", f"/top/?tag={rng.choice(world['tags'])}", None),
+    "random": lambda rng, world: ("anon", "/random/?n=10", None),
+    "react": lambda rng, world: (
+        "anon", f"/{rng.choice(world['quotes'])}/react/", {"action": rng.choice(("like", "dislike"))},
+    ),
+    "add": lambda rng, world: ("user", "/add/", {
+        "text": f"Нагрузочная цитата {uuid.uuid4().hex}",
+        "weight": rng.randint(1, 10),
+        "source_name": f"Источник {rng.randint(0, 50)}" if rng.random() < 0.8 else f"Новый {uuid.uuid4().hex[:8]}",
+    }),
+    "moderate": _moderate,
+}
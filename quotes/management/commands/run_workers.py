@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from quotes.jobs import claim_jobs, release_lost_jobs, requeue_stale
+from quotes.worker import execute, init_worker
+
+
+class Command(BaseCommand):
+    help = "Выполняет задачи из очереди Job пулом процессов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=2)
+        parser.add_argument("--poll", type=float, default=1.0, help="Пауза опроса пустой очереди (сек).")
+        parser.add_argument(
+            "--stale-after", type=int, default=600,
+            help="Через сколько секунд задача в статусе running считается брошенной.",
+        )
+        parser.add_argument("--once", action="store_true", help="Выполнить готовые задачи и выйти.")
+
+    def _new_pool(self, processes):
+        # соединения родителя не должны утечь в дочерние процессы
+        connections.close_all()
+        return ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(os.environ["DJANGO_SETTINGS_MODULE"],),
+        )
+
+    def handle(self, *args, **options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        processes = options["processes"]
+        running = {}
+        done = 0
+
+        pool = self._new_pool(processes)
+        try:
+            while True:
+                requeue_stale(options["stale_after"])
+                free = processes - len(running)
+                claimed = claim_jobs(worker_id, free) if free > 0 else []
+                try:
+                    for job_id in claimed:
+                        running[pool.submit(execute, job_id)] = job_id
+
+                    if not running:
+                        if options["once"]:
+                            break
+                        time.sleep(options["poll"])
+                        continue
+
+                    finished, _ = wait(running, timeout=options["poll"], return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        job_id = running[future]
+                        try:
+                            status = future.result()
+                        except BrokenProcessPool:
+                            raise  # задача остаётся в running — её вернёт обработчик ниже
+                        except Exception as exc:
+                            del running[future]
+                            self.stderr.write(f"job#{job_id}: ошибка в процессе пула: {exc!r}")
+                            release_lost_jobs([job_id], f"Ошибка в процессе пула {worker_id}: {exc!r}")
+                            continue
+                        del running[future]
+                        done += 1
+                        self.stdout.write(f"job#{job_id}: {status}")
+                except BrokenProcessPool as exc:
+                    # процесс пула умер (os._exit, OOM killer): пул больше не принимает задачи,
+                    # а все его незавершённые задачи пропали — засчитываем им попытку сразу
+                    lost = set(running.values()) | set(claimed)
+                    running.clear()
+                    self.stderr.write(f"Пул сломан ({exc!r}), задачам {sorted(lost)} засчитана неудачная попытка.")
+                    release_lost_jobs(lost, f"Процесс пула {worker_id} умер, не завершив задачу.")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self._new_pool(processes)
+        except KeyboardInterrupt:
+            self.stdout.write("Остановка: ждём выполняющиеся задачи…")
+        finally:
+            pool.shutdown(wait=True)
+        self.stdout.write(self.style.SUCCESS(f"Обработано задач: {done}."))
@@ -0,0 +1,85 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from quotes.models import Quote, Source, Tag, normalize_quote_text, normalize_source_name
+
+User = get_user_model()
+
+WORDS = (
+    "жизнь время свет путь дом мир правда память сила слово мечта дорога "
+    "сердце небо море огонь город книга ночь утро любовь судьба тень голос"
+).split()
+TAGS = ("драма", "комедия", "философия", "классика", "фантастика", "детектив", "поэзия", "история")
+PASSWORD = "loadtest-pass-123"
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет пустую БД демонстрационными данными: пользователи, теги, источники, "
+        "утверждённые цитаты и черновики. Используется loadtest."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--quotes", type=int, default=2000, help="Утверждённых цитат.")
+        parser.add_argument("--drafts", type=int, default=500, help="Черновиков в очереди модерации.")
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=1)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        moderator = User.objects.create_user("loadmod", password=PASSWORD, is_staff=True)
+        users = [moderator] + [
+            User.objects.create_user(f"loaduser{i}", password=PASSWORD) for i in range(options["users"])
+        ]
+        tags = [Tag.objects.get_or_create(name=name)[0] for name in TAGS]
+
+        # bulk_create минует Quote.save/clean, поэтому нормализованные поля заполняем сами;
+        # у источника не больше 3 утверждённых цитат
+        total = options["quotes"] + options["drafts"]
+        n_sources = (options["quotes"] + 2) // 3 + options["drafts"]
+        sources = Source.objects.bulk_create([
+            Source(
+                name=f"Источник {i}",
+                name_normalized=normalize_source_name(f"Источник {i}"),
+                status=Source.Status.APPROVED,
+                created_by=moderator,
+                approved_by=moderator,
+            )
+            for i in range(n_sources)
+        ])
+
+        quotes = []
+        for i in range(total):
+            approved = i < options["quotes"]
+            text = f"{' '.join(rng.choices(WORDS, k=rng.randint(6, 20))).capitalize()} (№{i})"
+            quotes.append(Quote(
+                text=text,
+                text_normalized=normalize_quote_text(text),
+                source=sources[i // 3] if approved else sources[(options["quotes"] + 2) // 3 + i - options["quotes"]],
+                weight=rng.randint(1, 10),
+                views=rng.randint(0, 5000) if approved else 0,
+                likes=rng.randint(0, 500) if approved else 0,
+                status=Quote.Status.APPROVED if approved else Quote.Status.DRAFT,
+                author=rng.choice(users),
+            ))
+        quotes = Quote.objects.bulk_create(quotes, batch_size=500)
+
+        Through = Quote.tags.through
+        Through.objects.bulk_create(
+            [
+                Through(quote_id=q.id, tag_id=t.id)
+                for q in quotes if q.status == Quote.Status.APPROVED
+                for t in rng.sample(tags, rng.randint(1, 3))
+            ],
+            batch_size=1000,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано: {len(users)} пользователей (пароль {PASSWORD}), {len(sources)} источников, "
+            f"{options['quotes']} утверждённых цитат, {options['drafts']} черновиков."
+        ))
@@ -0,0 +1,126 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.middleware.gzip import GZipMiddleware
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .profiling import profile_request, requested_mode
+from .views_moderation import is_moderator
+
+# ManifestStaticFilesStorage добавляет перед расширением 12 hex-символов md5
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.[^/.]+$")
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))  # при равных q — в этом порядке
+
+
+def accepted_encodings(header: str) -> dict:
+    """Accept-Encoding -> {кодировка: q}; "gzip;q=0" означает «нельзя», а не «можно»."""
+    accepted = {}
+    for item in header.split(","):
+        name, *params = item.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """
+    Отдаёт файлы из STATIC_ROOT без веб-сервера перед Django.
+
+    Файлы с хэшем в имени кэшируются «навсегда» (immutable), остальные —
+    на QUOTES_STATIC_MAX_AGE. Если клиент принимает br/gzip и collectstatic
+    положил сжатую копию, отдаётся она.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = str(settings.STATIC_ROOT) if settings.STATIC_ROOT else None
+        self.max_age = getattr(settings, "QUOTES_STATIC_MAX_AGE", 3600)
+        self.immutable_max_age = getattr(settings, "QUOTES_STATIC_IMMUTABLE_MAX_AGE", 365 * 24 * 3600)
+
+    def __call__(self, request):
+        if self.root and request.method in ("GET", "HEAD") and request.path.startswith(self.prefix):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        content_type, _ = mimetypes.guess_type(path)
+        accepted = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        encoding, suffix, best_q = None, "", 0.0
+        for enc, ext in ENCODINGS:
+            q = accepted.get(enc, accepted.get("*", 0.0))
+            if q > best_q and os.path.isfile(path + ext):
+                encoding, suffix, best_q = enc, ext, q
+        path += suffix
+
+        stat = os.stat(path)
+        if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(path, "rb"), content_type=content_type or "application/octet-stream")
+            # FileResponse берёт имя из файла (base.<hash>.css.gz); статике Content-Disposition не нужен
+            response.headers.pop("Content-Disposition", None)
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+        response.headers["Last-Modified"] = http_date(stat.st_mtime)
+        if HASHED_NAME_RE.search(name):
+            response.headers["Cache-Control"] = f"public, max-age={self.immutable_max_age}, immutable"
+        else:
+            response.headers["Cache-Control"] = f"public, max-age={self.max_age}"
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
+
+
+class ThresholdGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware с настраиваемым порогом QUOTES_GZIP_MIN_LENGTH (байт)."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_length = getattr(settings, "QUOTES_GZIP_MIN_LENGTH", 1024)
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < self.min_length:
+            return response
+        return super().process_response(request, response)
+
+
+class ProfilerMiddleware:
+    """
+    Профилирует запрос модератора с ?__profile=1 / X-Profile: 1 (см. quotes.profiling).
+    Для остальных запросов — одна проверка строки запроса, без профайлера.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = requested_mode(request)
+        if mode is None or not is_moderator(request.user):
+            return self.get_response(request)
+        return profile_request(request, self.get_response, mode)
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+# внешняя FTS5-таблица поверх quotes_quote.text, синхронизируется триггерами
+FTS_CREATE = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS quotes_quote_fts USING fts5(
+        text, content='quotes_quote', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS quotes_quote_fts_ai AFTER INSERT ON quotes_quote BEGIN
+        INSERT INTO quotes_quote_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS quotes_quote_fts_ad AFTER DELETE ON quotes_quote BEGIN
+        INSERT INTO quotes_quote_fts(quotes_quote_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS quotes_quote_fts_au AFTER UPDATE OF text ON quotes_quote BEGIN
+        INSERT INTO quotes_quote_fts(quotes_quote_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO quotes_quote_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    "INSERT INTO quotes_quote_fts(quotes_quote_fts) VALUES ('rebuild')",
+]
+FTS_DROP = [
+    "DROP TRIGGER IF EXISTS quotes_quote_fts_au",
+    "DROP TRIGGER IF EXISTS quotes_quote_fts_ad",
+    "DROP TRIGGER IF EXISTS quotes_quote_fts_ai",
+    "DROP TABLE IF EXISTS quotes_quote_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # на других СУБД поиск в админке откатывается на icontains (quotes.search)
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0002_resourceversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='moderationlog',
+            index=models.Index(fields=['-created_at'], name='modlog_created_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(fields=['-created_at'], name='quote_created_desc_idx'),
+        ),
+        migrations.RunPython(_run(FTS_CREATE), _run(FTS_DROP)),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0005_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='moderationlog',
+            name='quotes_mode_quote_i_197a6b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='moderationlog',
+            name='modlog_created_desc_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='quote',
+            name='quotes_quot_status_bc6cd2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='quote',
+            name='quotes_quot_source__522df3_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='quote',
+            name='quotes_quot_likes_1180ac_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='quote',
+            name='quote_created_desc_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='source',
+            name='quotes_sour_status_554a66_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='source',
+            name='quotes_sour_name_no_02352a_idx',
+        ),
+        migrations.AddIndex(
+            model_name='moderationlog',
+            index=models.Index(fields=['created_at'], name='modlog_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(fields=['source', 'status', 'weight'], name='quote_source_status_weight_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(fields=['created_at'], name='quote_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(condition=models.Q(('status', 'approved')), fields=['-likes', '-views', '-created_at'], name='quote_approved_top_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(condition=models.Q(('status', 'draft')), fields=['created_at'], name='quote_draft_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='source',
+            index=models.Index(fields=['status', 'name'], name='source_status_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='source',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at'], name='source_pending_idx'),
+        ),
+    ]
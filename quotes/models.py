@@ -71,9 +71,11 @@ class Source(models.Model):
         return self.name
 
     class Meta:
+        # status и name_normalized уже проиндексированы на уровне полей
         indexes = [
-            models.Index(fields=["status"]),
-            models.Index(fields=["name_normalized"]),
+            # список утверждённых источников в очереди модерации, по имени, только из индекса
+            models.Index(fields=["status", "name"], name="source_status_name_idx"),
+            models.Index(fields=["created_at"], condition=models.Q(status="pending"), name="source_pending_idx"),
         ]
 
 
@@ -150,10 +152,22 @@ class Quote(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        # частичные индексы (condition) построены по manage.py audit_queries
         indexes = [
-            models.Index(fields=["status"]),
-            models.Index(fields=["source", "status"]),
-            models.Index(fields=["-likes", "-views", "-created_at"]),
+            # сэмплер читает (id, weight) утверждённых цитат только из индекса: rowid в нём уже есть.
+            # status — колонкой, а не condition: иначе SQLite не считает индекс покрывающим
+            models.Index(fields=["source", "status", "weight"], name="quote_source_status_weight_idx"),
+            # сортировка по умолчанию (админка, списки) без сортировки всей таблицы;
+            # по возрастанию: обратный проход даёт и «-created_at, -pk» админки (rowid в индексе)
+            models.Index(fields=["created_at"], name="quote_created_idx"),
+            # топ: читается по порядку индекса и останавливается на LIMIT
+            models.Index(
+                fields=["-likes", "-views", "-created_at"],
+                condition=models.Q(status="approved"),
+                name="quote_approved_top_idx",
+            ),
+            # очередь модерации: черновики по -created_at
+            models.Index(fields=["created_at"], condition=models.Q(status="draft"), name="quote_draft_created_idx"),
         ]
 
 
@@ -178,5 +192,83 @@ class ModerationLog(models.Model):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["action"]),
-            models.Index(fields=["quote"]),
+            models.Index(fields=["created_at"], name="modlog_created_idx"),
+        ]
+
+
+class ModerationStat(models.Model):
+    """
+    Свёртка ModerationLog: число действий модератора за день.
+    Пополняется archive_moderation_logs перед удалением строк лога,
+    поэтому статистика переживает архивацию.
+    """
+
+    moderator = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="moderation_stats"
+    )
+    action = models.CharField(max_length=10, choices=ModerationLog.Action.choices)
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day} • {self.moderator_id or 'system'} • {self.action} × {self.count}"
+
+    class Meta:
+        ordering = ["-day"]
+        constraints = [
+            models.UniqueConstraint(fields=["moderator", "action", "day"], name="modstat_unique_day"),
+        ]
+
+
+# --------- служебные модели ---------
+class ResourceVersion(models.Model):
+    """Счётчик изменений ресурса: из него строятся ETag/Last-Modified без выборки всех строк."""
+
+    name = models.CharField(max_length=32, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name}@{self.version}"
+
+
+class Job(models.Model):
+    """Задача фоновой очереди (quotes.jobs, manage.py run_workers)."""
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    name = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict, blank=True)
+    # у ожидающих задач ключ уникален: повторная постановка схлопывается в одну
+    dedupe_key = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name}#{self.pk} ({self.status})"
+
+    class Meta:
+        ordering = ["run_after", "id"]
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="job_status_run_after_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=models.Q(status="queued"),
+                name="job_unique_queued_dedupe_key",
+            ),
         ]
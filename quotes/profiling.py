@@ -0,0 +1,188 @@
+"""
+Профилирование одного запроса по требованию модератора.
+
+`?__profile=1` (или заголовок X-Profile: 1) — сэмплирующий профайлер: отдельный
+поток раз в миллисекунду снимает стек потока запроса. Результат — «свёрнутые»
+стеки (folded), которые понимают flamegraph.pl, speedscope и inferno.
+`?__profile=cprofile` — детерминированный cProfile; сохраняется ещё и .prof
+(snakeviz, flameprof). В обоих режимах записывается весь SQL запроса.
+
+Профили лежат в QUOTES_PROFILE_DIR, не больше QUOTES_PROFILE_KEEP штук:
+самые старые удаляются (кольцевой буфер).
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+PROFILE_PARAM = "__profile"
+PROFILE_HEADER = "HTTP_X_PROFILE"
+SAMPLE_INTERVAL = 0.001
+PROFILE_ID_RE = re.compile(r"^\d{8}-\d{9}-[0-9a-f]{8}$")
+TOP_FUNCTIONS = 30
+
+
+def profile_dir() -> Path:
+    return Path(getattr(settings, "QUOTES_PROFILE_DIR", settings.BASE_DIR / "profiles"))
+
+
+def requested_mode(request) -> Optional[str]:
+    """Режим профилирования из запроса или None. Дешёвая проверка строки запроса — первой."""
+    if PROFILE_PARAM not in request.META.get("QUERY_STRING", "") and PROFILE_HEADER not in request.META:
+        return None
+    value = request.GET.get(PROFILE_PARAM) or request.META.get(PROFILE_HEADER, "")
+    return "cprofile" if value == "cprofile" else "sample"
+
+
+# --------- сэмплирующий профайлер ---------
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    for prefix in (str(settings.BASE_DIR) + os.sep, *(p + os.sep for p in sys.path if p.endswith("-packages"))):
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="quotes-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def top(self, limit: int = TOP_FUNCTIONS) -> List[dict]:
+        own, total = Counter(), Counter()
+        for stack, n in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += n
+            for label in set(frames):
+                total[label] += n
+        samples = sum(self.stacks.values()) or 1
+        return [
+            {"function": label, "self_pct": 100 * n / samples, "total_pct": 100 * total[label] / samples}
+            for label, n in own.most_common(limit)
+        ]
+
+
+# --------- запуск и хранение ---------
+def profile_request(request, get_response, mode: str):
+    """Выполняет запрос под профайлером, сохраняет профиль и добавляет X-Profile-Id в ответ."""
+    now = time.time()
+    # дата-время с миллисекундами: сортировка id совпадает с хронологией
+    stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}{int(now * 1000) % 1000:03d}"
+    profile_id = f"{stamp}-{uuid.uuid4().hex[:8]}"
+    record = {
+        "id": profile_id,
+        "mode": mode,
+        "method": request.method,
+        "path": request.get_full_path(),
+        "user": request.user.get_username(),
+        "created_at": now,
+    }
+    started = time.perf_counter()
+    with CaptureQueriesContext(connection) as queries:
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            response = profiler.runcall(get_response, request)
+        else:
+            with StackSampler(threading.get_ident()) as sampler:
+                response = get_response(request)
+    record["duration_ms"] = (time.perf_counter() - started) * 1000
+    record["status"] = response.status_code
+    record["sql"] = [{"sql": q["sql"], "time_ms": float(q["time"]) * 1000} for q in queries.captured_queries]
+
+    out = profile_dir()
+    out.mkdir(parents=True, exist_ok=True)
+    if mode == "cprofile":
+        profiler.dump_stats(out / f"{profile_id}.prof")
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        record["report"] = text.getvalue()
+    else:
+        record["top"] = sampler.top()
+        record["samples"] = sum(sampler.stacks.values())
+        (out / f"{profile_id}.folded").write_text(sampler.folded(), encoding="utf-8")
+    (out / f"{profile_id}.json").write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+    _trim(out)
+
+    response["X-Profile-Id"] = profile_id
+    return response
+
+
+def _trim(out: Path) -> None:
+    keep = getattr(settings, "QUOTES_PROFILE_KEEP", 50)
+    for stale in sorted(p.stem for p in out.glob("*.json"))[:-keep]:
+        for suffix in (".json", ".folded", ".prof"):
+            try:
+                (out / f"{stale}{suffix}").unlink()
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> List[dict]:
+    out = profile_dir()
+    if not out.exists():
+        return []
+    items = []
+    for path in sorted(out.glob("*.json"), reverse=True):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        data["sql_count"] = len(data.get("sql", []))
+        data["sql_ms"] = sum(q["time_ms"] for q in data.get("sql", []))
+        items.append(data)
+    return items
+
+
+def profile_file(profile_id: str, suffix: str) -> Optional[Path]:
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    path = profile_dir() / f"{profile_id}{suffix}"
+    return path if path.exists() else None
+
+
+def load_profile(profile_id: str) -> Optional[dict]:
+    path = profile_file(profile_id, ".json")
+    if path is None:
+        return None
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data["sql_ms"] = sum(q["time_ms"] for q in data["sql"])
+    return data
@@ -0,0 +1,106 @@
+"""
+Взвешенный выбор с исключением уже показанных цитат.
+
+SeenFilter — «недавно просмотренные» id посетителя в двух фильтрах Блума
+по 1024 бита (около 350 символов в cookie). Новые id пишутся в текущий; когда
+в нём CAPACITY элементов, он становится предыдущим, а текущий очищается —
+так помнятся последние 100–200 показов без роста cookie.
+
+pick_unseen_index сначала пробует выборку с отклонением: бинарный поиск по
+префиксным суммам весов, O(log n) на попытку. Если посетитель видел почти всё,
+небольшой каталог добирается точным проходом, а большой возвращает None —
+вызывающий код сбрасывает фильтр и выбирает как обычно.
+"""
+import base64
+import bisect
+import hashlib
+import random
+import struct
+from typing import Callable, Optional, Sequence
+
+FILTER_BITS = 1024
+FILTER_BYTES = FILTER_BITS // 8
+HASHES = 7  # ~1% ложных срабатываний при CAPACITY элементах
+CAPACITY = 100
+COOKIE_VERSION = 1
+_HEADER = struct.Struct("<BH")
+
+REJECTION_TRIES = 16
+EXACT_SCAN_LIMIT = 5000
+
+
+class SeenFilter:
+    def __init__(self, current: bytes = b"", previous: bytes = b"", count: int = 0):
+        self.current = bytearray(current or FILTER_BYTES)
+        self.previous = bytearray(previous or FILTER_BYTES)
+        self.count = count
+
+    @staticmethod
+    def _positions(quote_id: int):
+        digest = hashlib.blake2b(quote_id.to_bytes(8, "little", signed=True), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        return [(h1 + i * h2) % FILTER_BITS for i in range(HASHES)]
+
+    @staticmethod
+    def _has(bits: bytearray, positions) -> bool:
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def __contains__(self, quote_id: int) -> bool:
+        positions = self._positions(quote_id)
+        return self._has(self.current, positions) or self._has(self.previous, positions)
+
+    def add(self, quote_id: int) -> None:
+        positions = self._positions(quote_id)
+        if self._has(self.current, positions):
+            return
+        if self.count >= CAPACITY:
+            self.previous, self.current, self.count = self.current, bytearray(FILTER_BYTES), 0
+        for p in positions:
+            self.current[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def clear(self) -> None:
+        self.current, self.previous, self.count = bytearray(FILTER_BYTES), bytearray(FILTER_BYTES), 0
+
+    def dumps(self) -> str:
+        raw = _HEADER.pack(COOKIE_VERSION, self.count) + bytes(self.current) + bytes(self.previous)
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @classmethod
+    def loads(cls, value: Optional[str]) -> "SeenFilter":
+        """Битая или устаревшая cookie — просто пустой фильтр."""
+        if not value:
+            return cls()
+        try:
+            raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+            version, count = _HEADER.unpack_from(raw)
+        except (ValueError, struct.error):
+            return cls()
+        body = raw[_HEADER.size:]
+        if version != COOKIE_VERSION or len(body) != 2 * FILTER_BYTES:
+            return cls()
+        return cls(body[:FILTER_BYTES], body[FILTER_BYTES:], min(count, CAPACITY))
+
+
+def pick_unseen_index(
+    cum_weights: Sequence[int],
+    weights: Sequence[int],
+    id_at: Callable[[int], int],
+    seen: Optional[SeenFilter],
+    rng=random,
+) -> Optional[int]:
+    """Индекс по весам среди не виденных; None — если найти не удалось (всё просмотрено)."""
+    count = len(cum_weights)
+    if not count:
+        return None
+    total = cum_weights[-1]
+    for _ in range(1 if seen is None else REJECTION_TRIES):
+        i = bisect.bisect_right(cum_weights, rng.random() * total)
+        if seen is None or id_at(i) not in seen:
+            return i
+    if count > EXACT_SCAN_LIMIT:
+        return None
+    candidates = [i for i in range(count) if id_at(i) not in seen]
+    if not candidates:
+        return None
+    return rng.choices(candidates, weights=[weights[i] for i in candidates], k=1)[0]
@@ -0,0 +1,73 @@
+"""
+Индексный поиск для админки.
+
+Текст цитат ищется через SQLite FTS5-таблицу quotes_quote_fts (см. миграцию
+0003), остальное — через обычные B-tree индексы: точное совпадение или
+префикс в виде диапазона (>= term, < term + max), который индекс обслуживает,
+в отличие от LIKE '%term%'.
+"""
+from django.db import connection
+from django.db.models import QuerySet
+from django.db.models.expressions import RawSQL
+
+from .models import normalize_source_name
+
+QUOTE_FTS_TABLE = "quotes_quote_fts"
+PREFIX_MAX = "\U0010ffff"
+
+_fts_available = None
+
+
+def quote_fts_available() -> bool:
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = (
+            connection.vendor == "sqlite"
+            and QUOTE_FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available
+
+
+def fts_match_query(term: str) -> str:
+    # каждое слово — отдельная префиксная фраза: кавычки экранируют синтаксис FTS5
+    tokens = [t.replace('"', '""') for t in term.split()]
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def search_quotes(qs: QuerySet, term: str) -> QuerySet:
+    term = term.strip()
+    if not term:
+        return qs
+    if term.isdecimal():
+        return qs.filter(pk=int(term))
+    if quote_fts_available():
+        return qs.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {QUOTE_FTS_TABLE} WHERE {QUOTE_FTS_TABLE} MATCH %s",
+                (fts_match_query(term),),
+            )
+        )
+    return qs.filter(text__icontains=term)
+
+
+def prefix_range(field: str, prefix: str) -> dict:
+    return {f"{field}__gte": prefix, f"{field}__lt": prefix + PREFIX_MAX}
+
+
+def search_sources(qs: QuerySet, term: str) -> QuerySet:
+    term = term.strip()
+    if not term:
+        return qs
+    if term.isdecimal():
+        return qs.filter(pk=int(term))
+    return qs.filter(**prefix_range("name_normalized", normalize_source_name(term)))
+
+
+def search_moderation_logs(qs: QuerySet, term: str) -> QuerySet:
+    """Число — id цитаты, иначе — точный логин модератора."""
+    term = term.strip()
+    if not term:
+        return qs
+    if term.isdecimal():
+        return qs.filter(quote_id=int(term))
+    return qs.filter(moderator__username=term)
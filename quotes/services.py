@@ -1,7 +1,22 @@
+import heapq
 import random
-from typing import List, Optional
-from django.db.models import F, QuerySet
-from .models import Quote, Source, Tag, normalize_source_name
+from collections import Counter
+from datetime import datetime
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.db.models import Count, F, QuerySet, Sum
+from django.utils import timezone
+from .cache import cached
+from .sampling import SeenFilter, pick_unseen_index
+from .models import (
+    ModerationLog,
+    ModerationStat,
+    Quote,
+    ResourceVersion,
+    Source,
+    Tag,
+    normalize_source_name,
+)
 
 
 def get_or_create_source_by_name(name: str, user=None) -> Source:
@@ -35,14 +50,74 @@ def approved_quotes_qs() -> QuerySet[Quote]:
         .filter(status=Quote.Status.APPROVED, source__status=Source.Status.APPROVED)
 
 
-def pick_weighted_random_quote(qs: Optional[QuerySet[Quote]] = None) -> Optional[Quote]:
-    qs = qs if qs is not None else approved_quotes_qs()
-    ids_weights = list(qs.values_list("id", "weight"))
+# "weights" поднимают только изменения состава и весов утверждённых цитат (signals), не лайки
+@cached("approved_weights", soft_ttl=60, namespaces=("weights",))
+def approved_quote_weights() -> List[Tuple[int, int]]:
+    # без ORDER BY: (id, weight) читаются из покрывающего индекса quote_source_status_weight_idx
+    return list(approved_quotes_qs().order_by().values_list("id", "weight"))
+
+
+def pick_weighted_random_quote(
+    qs: Optional[QuerySet[Quote]] = None, seen: Optional[SeenFilter] = None
+) -> Optional[Quote]:
+    """
+    Случайная цитата с вероятностью, пропорциональной весу.
+    Цитаты из `seen` пропускаются; если посетитель видел всё — фильтр сбрасывается.
+    """
+    if qs is None:
+        # по умолчанию (id, weight) берём из кэша; запись могла устареть — тогда без кэша
+        quote = _pick_weighted(approved_quotes_qs(), approved_quote_weights(), seen)
+        if quote is not None:
+            return quote
+        qs = approved_quotes_qs()
+    return _pick_weighted(qs, list(qs.values_list("id", "weight")), seen)
+
+
+def _pick_weighted(
+    qs: QuerySet[Quote], ids_weights: List[Tuple[int, int]], seen: Optional[SeenFilter] = None
+) -> Optional[Quote]:
     if not ids_weights:
         return None
     ids, weights = zip(*ids_weights)
-    chosen_id = random.choices(population=ids, weights=weights, k=1)[0]
-    return qs.get(id=chosen_id)
+    cum_weights = list(accumulate(weights))
+    i = pick_unseen_index(cum_weights, weights, ids.__getitem__, seen)
+    if i is None:
+        seen.clear()
+        i = pick_unseen_index(cum_weights, weights, ids.__getitem__, None)
+    return qs.filter(id=ids[i]).first()
+
+
+def sample_weighted_ids(ids_weights: List[Tuple[int, int]], k: int, rng=random) -> List[int]:
+    """
+    k разных id без возвращения, с вероятностями по весам (Efraimidis–Spirakis):
+    у каждого ключ u ** (1 / w), берём k наибольших. Один проход, O(n log k).
+    """
+    if k <= 0 or not ids_weights:
+        return []
+    keyed = ((rng.random() ** (1.0 / weight), quote_id) for quote_id, weight in ids_weights)
+    return [quote_id for _, quote_id in heapq.nlargest(k, keyed)]
+
+
+def random_quotes(n: int) -> List[Quote]:
+    """
+    n разных утверждённых цитат по весам: одна выборка (id, weight) из кэша,
+    один IN-запрос с источниками и тегами, один UPDATE счётчиков просмотров.
+    """
+    chosen = sample_weighted_ids(approved_quote_weights(), n)
+    if not chosen:
+        return []
+    by_id = {q.id: q for q in approved_quotes_qs().filter(id__in=chosen).order_by()}
+    quotes = [by_id[quote_id] for quote_id in chosen if quote_id in by_id]
+    register_views(quotes)
+    return quotes
+
+
+def register_views(quotes: List[Quote]) -> None:
+    if not quotes:
+        return
+    Quote.objects.filter(pk__in=[q.pk for q in quotes]).update(views=F("views") + 1)
+    for quote in quotes:
+        quote.views += 1
 
 
 def register_view(quote: Quote) -> None:
@@ -55,7 +130,67 @@ def register_reaction(quote_id: int, action: str) -> None:
         Quote.objects.filter(pk=quote_id).update(likes=F("likes") + 1)
     elif action == "dislike":
         Quote.objects.filter(pk=quote_id).update(dislikes=F("dislikes") + 1)
+    else:
+        return
+    bump_resource_version("quotes")
+
 
+def top_quotes(limit: int = 10, tag_id: Optional[int] = None) -> QuerySet[Quote]:
+    qs = approved_quotes_qs()
+    if tag_id:
+        qs = qs.filter(tags__id=tag_id)
+    return qs.order_by("-likes", "-views", "-created_at")[:limit]
 
-def top_quotes(limit: int = 10) -> QuerySet[Quote]:
-    return approved_quotes_qs().order_by("-likes", "-views", "-created_at")[:limit]
+
+@cached("top_quotes", soft_ttl=30, namespaces=("quotes", "sources", "tags"))
+def cached_top_quotes(limit: int = 10, tag_id: Optional[int] = None) -> List[Quote]:
+    return list(top_quotes(limit, tag_id=tag_id))
+
+
+@cached("tags", soft_ttl=300, namespaces=("tags",))
+def all_tags() -> List[Tag]:
+    return list(Tag.objects.all())
+
+
+# --------- версии ресурсов (для HTTP-кэширования) ---------
+def bump_resource_version(*names: str) -> None:
+    now = timezone.now()
+    for name in names:
+        updated = ResourceVersion.objects.filter(name=name).update(
+            version=F("version") + 1, updated_at=now
+        )
+        if not updated:
+            ResourceVersion.objects.get_or_create(name=name, defaults={"version": 1, "updated_at": now})
+
+
+def resource_versions(names: Iterable[str]) -> Dict[str, Tuple[int, datetime]]:
+    return {
+        name: (version, updated_at)
+        for name, version, updated_at in ResourceVersion.objects
+        .filter(name__in=list(names))
+        .values_list("name", "version", "updated_at")
+    }
+
+
+# --------- статистика модерации ---------
+def rollup_moderation_logs(rows: Iterable[dict]) -> None:
+    """Добавляет строки лога (moderator_id, action, created_at) в дневную свёртку ModerationStat."""
+    counts = Counter(
+        (row["moderator_id"], row["action"], timezone.localdate(row["created_at"])) for row in rows
+    )
+    for (moderator_id, action, day), n in counts.items():
+        updated = ModerationStat.objects.filter(moderator_id=moderator_id, action=action, day=day)\
+            .update(count=F("count") + n)
+        if not updated:
+            ModerationStat.objects.create(moderator_id=moderator_id, action=action, day=day, count=n)
+
+
+def moderator_action_counts() -> Dict[Optional[int], Dict[str, int]]:
+    """{moderator_id: {action: count}} — архивированная свёртка плюс живой лог."""
+    out: Dict[Optional[int], Dict[str, int]] = {}
+    archived = ModerationStat.objects.values("moderator_id", "action").annotate(n=Sum("count")).order_by()
+    live = ModerationLog.objects.values("moderator_id", "action").annotate(n=Count("id")).order_by()
+    for row in list(archived) + list(live):
+        per_action = out.setdefault(row["moderator_id"], {})
+        per_action[row["action"]] = per_action.get(row["action"], 0) + row["n"]
+    return out
@@ -0,0 +1,131 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+from .jobs import enqueue_on_commit
+from .models import Quote, Source, Tag
+from .services import bump_resource_version
+from .snapshot import RESOURCE as CATALOGUE_RESOURCE
+
+User = get_user_model()
+
+# ресурс -> модели, изменение которых делает его ETag устаревшим
+RESOURCE_MODELS = {
+    "quotes": (Quote,),
+    "sources": (Source,),
+    "tags": (Tag,),
+    "users": (User,),
+}
+
+# поля, от которых зависят производные ресурсы (weights и др.): их значения при загрузке
+# запоминаются, и после save видно, что именно поменялось
+TRACKED_FIELDS = {
+    Quote: ("status", "weight", "source_id"),
+    Source: ("status", "name", "merged_into_id"),
+}
+
+
+def _bump_for(sender):
+    names = [name for name, models in RESOURCE_MODELS.items() if sender in models]
+    if names:
+        bump_resource_version(*names)
+
+
+def _schedule_snapshot_rebuild():
+    # снимок главной (quotes.snapshot) пересобирает воркер; ожидающие пересборки схлопываются в одну.
+    # До пересборки снимок отстаёт от версии "catalogue", и главная выбирает из БД
+    bump_resource_version(CATALOGUE_RESOURCE)
+    enqueue_on_commit("rebuild_snapshot", dedupe_key="rebuild_snapshot")
+
+
+def _remember(instance):
+    instance._tracked = {f: instance.__dict__.get(f) for f in TRACKED_FIELDS[type(instance)]}
+
+
+def _changes(instance, created):
+    """(изменившиеся поля, прежний статус) с момента загрузки или прошлого save."""
+    fields = TRACKED_FIELDS[type(instance)]
+    before = {} if created else getattr(instance, "_tracked", {})
+    changed = {f for f in fields if before.get(f) != getattr(instance, f)}
+    return changed, before.get("status")
+
+
+@receiver(post_init, sender=Quote)
+@receiver(post_init, sender=Source)
+def remember_tracked(sender, instance, **kwargs):
+    _remember(instance)
+
+
+def bump_on_change(sender, **kwargs):
+    if kwargs.get("raw"):
+        return
+    _bump_for(sender)
+
+
+# только для моделей из RESOURCE_MODELS: приёмник без sender отключил бы быстрое
+# удаление (Collector.can_fast_delete) у всех моделей и срабатывал бы на каждый save
+for _models in RESOURCE_MODELS.values():
+    for _model in _models:
+        post_save.connect(bump_on_change, sender=_model, dispatch_uid=f"bump_on_save:{_model._meta.label}")
+        post_delete.connect(bump_on_change, sender=_model, dispatch_uid=f"bump_on_delete:{_model._meta.label}")
+
+
+@receiver(post_save, sender=Quote)
+def bump_on_quote_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    changed, old_status = _changes(instance, created)
+    _remember(instance)
+    if Quote.Status.APPROVED not in (old_status, instance.status):
+        return
+    if changed:
+        bump_resource_version("weights")
+    # текст, теги и прочее снимок тоже хранит — любое сохранение утверждённой цитаты
+    _schedule_snapshot_rebuild()
+
+
+@receiver(post_save, sender=Source)
+def bump_on_source_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    changed, old_status = _changes(instance, created)
+    _remember(instance)
+    if Source.Status.APPROVED not in (old_status, instance.status):
+        return  # новый или отредактированный pending-источник не виден ни в выдаче, ни в подсказках
+    if "status" in changed:
+        bump_resource_version("weights")
+    if changed:
+        # утверждение, отклонение, слияние, переименование — индекс подсказок (typeahead)
+        bump_resource_version("source_names")
+        _schedule_snapshot_rebuild()
+
+
+@receiver(post_delete, sender=Quote)
+@receiver(post_delete, sender=Source)
+def bump_on_approved_delete(sender, instance, **kwargs):
+    if instance.status != "approved":
+        return
+    bump_resource_version("weights")
+    if sender is Source:
+        bump_resource_version("source_names")
+    _schedule_snapshot_rebuild()
+
+
+@receiver(post_delete, sender=Tag)
+def rebuild_on_tag_delete(sender, **kwargs):
+    # связи с цитатами удаляются каскадом, без m2m_changed
+    _schedule_snapshot_rebuild()
+
+
+@receiver(m2m_changed, sender=Quote.tags.through)
+def bump_on_quote_tags(sender, instance, action, reverse, **kwargs):
+    if action.startswith("post_"):
+        bump_resource_version("quotes")
+        # со стороны тега (reverse) затронутые цитаты не проверяем — пересобираем всегда
+        if reverse or instance.status == Quote.Status.APPROVED:
+            _schedule_snapshot_rebuild()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def bump_on_user_groups(sender, action, **kwargs):
+    if action.startswith("post_"):
+        bump_resource_version("users")
@@ -0,0 +1,265 @@
+"""
+Снимок утверждённых цитат в одном файле, общий для всех воркеров.
+
+Файл строится из approved_quotes_qs() (build_snapshot / задача rebuild_snapshot)
+и подменяется атомарно через os.replace. Каждый процесс отображает его в память
+только на чтение (mmap): страницы файла лежат в page cache один раз на машину,
+а выбор и отрисовка цитаты на главной не читают цитаты из БД.
+
+В заголовке — версия ресурса "catalogue" на момент сборки; её поднимают сигналы
+при каждом изменении, которое попадает в снимок. Если в БД версия новее
+(воркер лежит или не успел пересобрать), get_snapshot() возвращает None и
+главная выбирает из БД — снятые с публикации цитаты не показываются.
+
+Формат (little-endian, секции выровнены по 8 байт):
+
+    header   4s magic, I version, I count, I n_sources, I n_tag_links, Q catalogue_version
+    offsets  Q × SECTIONS — смещения секций от начала файла
+    ids          q[count]        — по возрастанию, поиск по id — bisect
+    weights      I[count]
+    cum_weights  Q[count]        — префиксные суммы весов, выбор — bisect
+    views        I[count]        — счётчики на момент сборки
+    likes        I[count]
+    source_idx   I[count]        — индекс в таблице имён источников
+    source_offs  Q[n_sources+1]  + source_blob (utf-8)
+    tag_offs     I[count+1]      + tag_ids q[n_tag_links]
+    text_offs    Q[count+1]      + text_blob (utf-8)
+"""
+import bisect
+import mmap
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import List, Optional
+
+from django.conf import settings
+
+from .sampling import SeenFilter, pick_unseen_index
+
+MAGIC = b"QSNP"
+VERSION = 2
+HEADER = struct.Struct("<4sIIIIQ")
+SECTIONS = (
+    "ids", "weights", "cum_weights", "views", "likes", "source_idx",
+    "source_offs", "source_blob", "tag_offs", "tag_ids", "text_offs", "text_blob",
+)
+OFFSETS = struct.Struct(f"<{len(SECTIONS)}Q")
+FORMATS = {
+    "ids": "q", "weights": "I", "cum_weights": "Q", "views": "I", "likes": "I", "source_idx": "I",
+    "source_offs": "Q", "source_blob": "B", "tag_offs": "I", "tag_ids": "q", "text_offs": "Q", "text_blob": "B",
+}
+CHECK_INTERVAL = 1.0  # как часто (сек) процесс проверяет, не подменили ли файл и не устарел ли он
+RESOURCE = "catalogue"
+
+
+def snapshot_path() -> Path:
+    return Path(getattr(settings, "QUOTES_SNAPSHOT_PATH", settings.BASE_DIR / "catalogue.snap"))
+
+
+def current_catalogue_version() -> int:
+    from .services import resource_versions
+
+    return resource_versions([RESOURCE]).get(RESOURCE, (0, None))[0]
+
+
+# --------- сборка ---------
+def build_snapshot(path: Optional[Path] = None) -> int:
+    """Собирает снимок из approved_quotes_qs() и атомарно подменяет файл. Возвращает число цитат."""
+    from .services import approved_quotes_qs
+
+    path = Path(path or snapshot_path())
+    # версию читаем до выборки: изменение во время сборки оставит снимок «устаревшим»,
+    # а пересборку после него уже поставил сигнал
+    catalogue_version = current_catalogue_version()
+    cols = {name: array(FORMATS[name]) for name in SECTIONS}
+    source_index = {}
+    source_names: List[bytes] = []
+    text_parts: List[bytes] = []
+    total = text_len = 0
+    cols["tag_offs"].append(0)
+    cols["text_offs"].append(0)
+
+    qs = approved_quotes_qs().order_by("id")
+    for q in qs.iterator(chunk_size=2000):
+        total += q.weight
+        cols["ids"].append(q.id)
+        cols["weights"].append(q.weight)
+        cols["cum_weights"].append(total)
+        cols["views"].append(q.views)
+        cols["likes"].append(q.likes)
+        if q.source_id not in source_index:
+            source_index[q.source_id] = len(source_names)
+            source_names.append(q.source.name.encode("utf-8"))
+        cols["source_idx"].append(source_index[q.source_id])
+        cols["tag_ids"].extend(sorted(t.id for t in q.tags.all()))
+        cols["tag_offs"].append(len(cols["tag_ids"]))
+        encoded = q.text.encode("utf-8")
+        text_parts.append(encoded)
+        text_len += len(encoded)
+        cols["text_offs"].append(text_len)
+
+    cols["source_offs"].append(0)
+    for name in source_names:
+        cols["source_offs"].append(cols["source_offs"][-1] + len(name))
+    cols["source_blob"] = b"".join(source_names)
+    cols["text_blob"] = b"".join(text_parts)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            header_size = HEADER.size + OFFSETS.size
+            f.write(b"\0" * header_size)
+            offsets = []
+            for name in SECTIONS:
+                pos = f.tell()
+                pad = -pos % 8
+                f.write(b"\0" * pad)
+                offsets.append(pos + pad)
+                data = cols[name]
+                f.write(data if isinstance(data, bytes) else data.tobytes())
+            f.seek(0)
+            f.write(HEADER.pack(
+                MAGIC, VERSION, len(cols["ids"]), len(source_names), len(cols["tag_ids"]), catalogue_version,
+            ))
+            f.write(OFFSETS.pack(*offsets))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return len(cols["ids"])
+
+
+# --------- чтение ---------
+class SnapshotSource:
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+
+class SnapshotQuote:
+    """То, что шаблону главной нужно от Quote: pk, text, weight, views, likes, source.name."""
+
+    __slots__ = ("pk", "text", "weight", "views", "likes", "source", "tag_ids")
+
+    def __init__(self, pk, text, weight, views, likes, source, tag_ids):
+        self.pk = pk
+        self.text = text
+        self.weight = weight
+        self.views = views
+        self.likes = likes
+        self.source = source
+        self.tag_ids = tag_ids
+
+    @property
+    def id(self):
+        return self.pk
+
+    def __str__(self):
+        return f"{self.text[:60]}{'…' if len(self.text) > 60 else ''}"
+
+
+class CatalogueSnapshot:
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mm)
+        try:
+            magic, version, count, n_sources, n_links, catalogue_version = HEADER.unpack_from(buf, 0)
+        except struct.error:
+            raise ValueError(f"{path}: файл снимка обрезан")
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: не снимок каталога версии {VERSION}")
+        offsets = OFFSETS.unpack_from(buf, HEADER.size)
+        lengths = {
+            "ids": count, "weights": count, "cum_weights": count, "views": count, "likes": count,
+            "source_idx": count, "source_offs": n_sources + 1, "tag_offs": count + 1,
+            "tag_ids": n_links, "text_offs": count + 1,
+        }
+        self.count = count
+        self.catalogue_version = catalogue_version
+        for name, offset in zip(SECTIONS, offsets):
+            if name.endswith("_blob"):
+                continue
+            size = struct.calcsize(FORMATS[name]) * lengths[name]
+            setattr(self, name, buf[offset:offset + size].cast(FORMATS[name]))
+        self.source_blob = buf[offsets[SECTIONS.index("source_blob")]:]
+        self.text_blob = buf[offsets[SECTIONS.index("text_blob")]:]
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def total_weight(self) -> int:
+        return self.cum_weights[-1] if self.count else 0
+
+    def pick_index(self, rng=random, seen: Optional[SeenFilter] = None) -> Optional[int]:
+        """Взвешенный выбор за O(log n): бинарный поиск по префиксным суммам, минуя `seen`."""
+        return pick_unseen_index(self.cum_weights, self.weights, self.ids.__getitem__, seen, rng)
+
+    def index_of(self, quote_id: int) -> Optional[int]:
+        i = bisect.bisect_left(self.ids, quote_id)
+        return i if i < self.count and self.ids[i] == quote_id else None
+
+    def quote(self, i: int) -> SnapshotQuote:
+        s = self.source_idx[i]
+        source = bytes(self.source_blob[self.source_offs[s]:self.source_offs[s + 1]]).decode("utf-8")
+        text = bytes(self.text_blob[self.text_offs[i]:self.text_offs[i + 1]]).decode("utf-8")
+        tag_ids = tuple(self.tag_ids[self.tag_offs[i]:self.tag_offs[i + 1]])
+        return SnapshotQuote(
+            self.ids[i], text, self.weights[i], self.views[i], self.likes[i], SnapshotSource(source), tag_ids,
+        )
+
+    def pick(self, rng=random, seen: Optional[SeenFilter] = None) -> Optional[SnapshotQuote]:
+        i = self.pick_index(rng, seen)
+        if i is None and seen is not None and self.count:
+            # посетитель видел всё — начинаем новый круг
+            seen.clear()
+            i = self.pick_index(rng)
+        return None if i is None else self.quote(i)
+
+
+_lock = threading.Lock()
+_current = None  # (CatalogueSnapshot, (st_ino, st_mtime_ns, st_size))
+_fresh = False  # не отстаёт ли _current от версии "catalogue" в БД
+_checked_at = 0.0
+
+
+def get_snapshot() -> Optional[CatalogueSnapshot]:
+    """
+    Текущий снимок процесса или None, если файла нет, он нечитаем или отстаёт от БД.
+    Раз в CHECK_INTERVAL делает stat() (переоткрывает файл после подмены) и сверяет
+    версию "catalogue"; старое отображение живёт, пока на него есть ссылки.
+    """
+    global _current, _fresh, _checked_at
+    now = time.monotonic()
+    if _current is not None and now - _checked_at < CHECK_INTERVAL:
+        return _current[0] if _fresh else None
+    with _lock:
+        _checked_at = now
+        try:
+            st = os.stat(snapshot_path())
+        except FileNotFoundError:
+            _current = None
+            return None
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if _current is None or _current[1] != key:
+            try:
+                _current = (CatalogueSnapshot(snapshot_path()), key)
+            except ValueError:
+                _current = None  # старый формат или недописанный файл — до пересборки идём в БД
+                return None
+        _fresh = _current[0].catalogue_version >= current_catalogue_version()
+        return _current[0] if _fresh else None
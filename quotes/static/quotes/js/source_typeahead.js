@@ -0,0 +1,50 @@
+// Подсказки источников: поле с data-suggest-url заполняет свой <datalist> ответами /sources/suggest/.
+(function () {
+  "use strict";
+
+  var DELAY_MS = 150;
+
+  document.querySelectorAll("input[data-suggest-url]").forEach(function (input) {
+    var list = document.getElementById(input.getAttribute("list"));
+    if (!list) {
+      return;
+    }
+    var timer = null;
+    var controller = null;
+    var lastQuery = "";
+
+    function render(sources) {
+      list.replaceChildren.apply(list, sources.map(function (source) {
+        var option = document.createElement("option");
+        option.value = source.name;
+        return option;
+      }));
+    }
+
+    function load(query) {
+      if (controller) {
+        controller.abort();
+      }
+      controller = new AbortController();
+      var url = input.dataset.suggestUrl + "?q=" + encodeURIComponent(query);
+      fetch(url, { signal: controller.signal, headers: { Accept: "application/json" } })
+        .then(function (response) { return response.ok ? response.json() : { sources: [] }; })
+        .then(function (data) { render(data.sources); })
+        .catch(function () { /* запрос отменён следующим вводом или сеть недоступна */ });
+    }
+
+    input.addEventListener("input", function () {
+      var query = input.value.trim();
+      if (query === lastQuery) {
+        return;
+      }
+      lastQuery = query;
+      clearTimeout(timer);
+      if (query.length < 2) {
+        render([]);
+        return;
+      }
+      timer = setTimeout(function () { load(query); }, DELAY_MS);
+    });
+  });
+})();
@@ -0,0 +1,62 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него будут только .gz
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest-хранилище (имена с хэшем содержимого), которое при collectstatic
+    дополнительно кладёт рядом .gz и .br версии текстовых файлов.
+    Отдаёт их quotes.middleware.StaticFilesMiddleware.
+    """
+
+    manifest_strict = False
+    compress_extensions = (".css", ".js", ".mjs", ".svg", ".json", ".map", ".txt", ".xml", ".html")
+    compress_min_size = 256
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # collectstatic ещё не запускали (локальная разработка, тесты)
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for original_name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                names.add(original_name)
+                if hashed_name:
+                    names.add(hashed_name)
+            yield original_name, hashed_name, processed
+
+        if dry_run:
+            return
+        for name in sorted(names):
+            if name.endswith(self.compress_extensions):
+                self._compress(self.path(name))
+
+    def _compress(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < self.compress_min_size:
+            return
+        # mtime=0 — одинаковый вход даёт одинаковый .gz
+        self._write_if_smaller(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0), data)
+        if brotli is not None:
+            self._write_if_smaller(path + ".br", brotli.compress(data, quality=11), data)
+
+    @staticmethod
+    def _write_if_smaller(path, compressed, original):
+        if len(compressed) >= len(original):
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        with open(path, "wb") as f:
+            f.write(compressed)
@@ -0,0 +1,32 @@
+"""Фоновые задачи, которые порождает модерация (выполняет manage.py run_workers)."""
+from django.db import connection
+
+from .jobs import job
+from .services import all_tags, approved_quote_weights, cached_top_quotes
+from .snapshot import build_snapshot
+
+
+@job("warm_caches")
+def warm_caches(payload):
+    # ставится, только если бэкенд кэша общий (cache_is_shared): file/database/redis
+    approved_quote_weights()
+    cached_top_quotes(10)
+    all_tags()
+
+
+@job("rebuild_snapshot")
+def rebuild_snapshot(payload):
+    build_snapshot()
+
+
+@job("optimize_db")
+def optimize_db(payload):
+    # обновляет статистику планировщика (и оценки числа строк в админке)
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            # приблизительный ANALYZE: не больше ~1000 строк на индекс, не держит БД долго
+            cursor.execute("PRAGMA analysis_limit = 1000")
+            cursor.execute("ANALYZE")
+    elif connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
@@ -1,3 +1,721 @@
-from django.test import TestCase
+import base64
+import gzip
+import json
+import random
+import tempfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.paginator import EmptyPage, InvalidPage
+from django.db import connection
+from django.db.models.deletion import Collector
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .admin import EstimatedCountPaginator
+from .jobs import claim_jobs, enqueue, job, requeue_stale, run_job
+from .middleware import StaticFilesMiddleware, accepted_encodings
+from .models import Job, ModerationLog, ModerationStat, Quote, ResourceVersion, Source, Tag
+from .sampling import CAPACITY, SeenFilter, pick_unseen_index
+from .search import search_quotes
+from . import snapshot as snapshot_module
+from .snapshot import CatalogueSnapshot, build_snapshot, get_snapshot
+from .typeahead import FUZZY_MAX_TYPOS, SourceIndex
+
+CALLS = []
+
+
+@job("test_ok")
+def _ok(payload):
+    CALLS.append(payload)
+
+
+@job("test_fail")
+def _fail(payload):
+    raise RuntimeError("boom")
+
+
+@job("test_crash")
+def _crash(payload):
+    raise AssertionError("выполняется только в FakePool, который «роняет» процесс")
+
+
+class FakePool:
+    """ProcessPoolExecutor в том же процессе; задача test_crash ломает пул, как os._exit в дочернем."""
+
+    created = 0
+
+    def __init__(self, *args, **kwargs):
+        FakePool.created += 1
+        self.broken = False
+
+    def submit(self, fn, job_id):
+        if self.broken:
+            raise BrokenProcessPool("пул сломан")
+        future = Future()
+        if Job.objects.get(pk=job_id).name == "test_crash":
+            self.broken = True
+            future.set_exception(BrokenProcessPool("процесс пула завершился"))
+        else:
+            future.set_result(fn(job_id))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def _make_due(self):
+        Job.objects.update(run_after=timezone.now() - timedelta(seconds=1))
+
+    def _run_failing(self, job_id):
+        with self.assertLogs("quotes.jobs", "ERROR"):
+            return run_job(job_id)
+
+    def test_enqueue_coalesces_queued_jobs_with_same_key(self):
+        first = enqueue("test_ok", dedupe_key="k")
+        self.assertIsNotNone(first)
+        self.assertIsNone(enqueue("test_ok", dedupe_key="k"))
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_claim_takes_job_once_and_counts_attempt(self):
+        item = enqueue("test_ok", payload={"n": 1}, dedupe_key="k")
+        self.assertEqual(claim_jobs("w1", 10), [item.pk])
+        self.assertEqual(claim_jobs("w2", 10), [])
+        item.refresh_from_db()
+        self.assertEqual((item.status, item.attempts, item.locked_by), (Job.Status.RUNNING, 1, "w1"))
+        self.assertEqual(item.dedupe_key, "k")
+
+        self.assertEqual(run_job(item.pk), Job.Status.DONE)
+        self.assertEqual(CALLS, [{"n": 1}])
+
+    def test_enqueue_while_running_creates_new_job(self):
+        enqueue("test_ok", dedupe_key="k")
+        claim_jobs("w1", 10)
+        self.assertIsNotNone(enqueue("test_ok", dedupe_key="k"))
+
+    def test_failed_job_is_retried_later_and_still_coalesces(self):
+        item = enqueue("test_fail", dedupe_key="k")
+        claim_jobs("w1", 10)
+        self.assertEqual(self._run_failing(item.pk), Job.Status.QUEUED)
+        item.refresh_from_db()
+        self.assertGreater(item.run_after, timezone.now())
+        self.assertEqual(item.dedupe_key, "k")
+        self.assertIn("boom", item.last_error)
+        self.assertIsNone(enqueue("test_fail", dedupe_key="k"))
+
+    def test_failed_job_yields_to_queued_twin(self):
+        item = enqueue("test_fail", dedupe_key="k")
+        claim_jobs("w1", 10)
+        twin = enqueue("test_fail", dedupe_key="k")
+        self.assertEqual(self._run_failing(item.pk), Job.Status.FAILED)
+        twin.refresh_from_db()
+        self.assertEqual(twin.status, Job.Status.QUEUED)
+
+    def test_gives_up_after_max_attempts(self):
+        item = enqueue("test_fail", max_attempts=2)
+        statuses = []
+        for _ in range(2):
+            self._make_due()
+            claim_jobs("w1", 10)
+            statuses.append(self._run_failing(item.pk))
+        self.assertEqual(statuses, [Job.Status.QUEUED, Job.Status.FAILED])
+        self.assertEqual(claim_jobs("w1", 10), [])
+
+    @mock.patch("quotes.management.commands.run_workers.ProcessPoolExecutor", FakePool)
+    def test_run_workers_survives_dead_pool_process(self):
+        FakePool.created = 0
+        ok = enqueue("test_ok", payload={"n": 1})
+        crash = enqueue("test_crash")
+        after = enqueue("test_ok", payload={"n": 2})
+        err = StringIO()
+        call_command("run_workers", "--once", "--processes", "3", stdout=StringIO(), stderr=err)
+
+        self.assertEqual(FakePool.created, 2)
+        self.assertIn("Пул сломан", err.getvalue())
+        ok.refresh_from_db()
+        self.assertEqual(ok.status, Job.Status.DONE)
+        # упавшая задача и та, что не успела уйти в пул, — сразу обратно в очередь с попыткой
+        for item in (crash, after):
+            item.refresh_from_db()
+            self.assertEqual((item.status, item.attempts, item.locked_by), (Job.Status.QUEUED, 1, ""))
+            self.assertIn("умер", item.last_error)
+            self.assertGreater(item.run_after, timezone.now())
+        self.assertEqual(CALLS, [{"n": 1}])
+
+    def test_stale_job_counts_as_attempt_and_stops_at_max(self):
+        item = enqueue("test_ok", dedupe_key="k", max_attempts=2)
+        for expected in (Job.Status.QUEUED, Job.Status.FAILED):
+            self._make_due()
+            self.assertEqual(claim_jobs("w1", 10), [item.pk])
+            Job.objects.filter(pk=item.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+            requeue_stale(timeout=60)
+            item.refresh_from_db()
+            self.assertEqual(item.status, expected)
+        self.assertEqual(item.attempts, 2)
+        self.assertIn("w1", item.last_error)
+
+
+class SnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = get_user_model().objects.create_user("author")
+        approved = Source.objects.create(name="Мастер и Маргарита", status=Source.Status.APPROVED)
+        withdrawn = Source.objects.create(name="Черновик романа", status=Source.Status.APPROVED)
+        cls.tag = Tag.objects.create(name="классика")
+        cls.first = Quote.objects.create(
+            text="Рукописи не горят.", source=approved, weight=3, views=7, likes=2,
+            status=Quote.Status.APPROVED, author=author,
+        )
+        cls.first.tags.add(cls.tag)
+        cls.second = Quote.objects.create(
+            text="Никогда ни о чём не просите.", source=approved, weight=5,
+            status=Quote.Status.APPROVED, author=author,
+        )
+        cls.draft = Quote.objects.create(text="Ещё не проверено.", source=approved, author=author)
+        cls.hidden = Quote.objects.create(
+            text="Источник больше не утверждён.", source=withdrawn, status=Quote.Status.APPROVED, author=author,
+        )
+        # в обход Quote.clean: источник сняли с утверждения, а цитата осталась approved
+        Source.objects.filter(pk=withdrawn.pk).update(status=Source.Status.PENDING)
+
+    def _build(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = Path(tmp.name) / "catalogue.snap"
+        count = build_snapshot(path)
+        return count, CatalogueSnapshot(path)
+
+    def test_round_trip(self):
+        count, snap = self._build()
+        self.assertEqual(count, 2)
+        self.assertEqual(list(snap.ids), [self.first.pk, self.second.pk])
+        self.assertEqual(snap.total_weight, 8)
+
+        quote = snap.quote(snap.index_of(self.first.pk))
+        self.assertEqual(
+            (quote.pk, quote.text, quote.weight, quote.views, quote.likes, quote.source.name, quote.tag_ids),
+            (self.first.pk, "Рукописи не горят.", 3, 7, 2, "Мастер и Маргарита", (self.tag.pk,)),
+        )
+        self.assertEqual(snap.quote(snap.index_of(self.second.pk)).tag_ids, ())
+
+    def test_only_approved_quotes_of_approved_sources(self):
+        _, snap = self._build()
+        self.assertIsNone(snap.index_of(self.draft.pk))
+        self.assertIsNone(snap.index_of(self.hidden.pk))
+
+    def test_pick_follows_weights(self):
+        _, snap = self._build()
+        rng = random.Random(1)
+        picks = [snap.pick(rng).pk for _ in range(2000)]
+        share = picks.count(self.second.pk) / len(picks)
+        self.assertAlmostEqual(share, 5 / 8, delta=0.05)
+
+    def test_pick_starts_new_round_when_everything_seen(self):
+        _, snap = self._build()
+        seen = SeenFilter()
+        seen.add(self.first.pk)
+        rng = random.Random(1)
+        self.assertEqual({snap.pick(rng, seen).pk for _ in range(50)}, {self.second.pk})
+
+        seen.add(self.second.pk)
+        self.assertIsNotNone(snap.pick(rng, seen))
+        self.assertEqual(seen.count, 0)
+
+    def _current_snapshot(self):
+        snapshot_module._checked_at = 0.0  # без ожидания CHECK_INTERVAL
+        return get_snapshot()
+
+    def test_snapshot_behind_database_is_not_served(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = Path(tmp.name) / "catalogue.snap"
+        override = override_settings(QUOTES_SNAPSHOT_PATH=path)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(setattr, snapshot_module, "_current", None)
+
+        self.assertIsNone(self._current_snapshot())
+        build_snapshot()
+        self.assertEqual(len(self._current_snapshot()), 2)
+
+        # воркер ещё не пересобрал снимок — главная идёт в БД и отклонённую цитату не покажет
+        self.first.status = Quote.Status.REJECTED
+        self.first.save()
+        self.assertIsNone(self._current_snapshot())
+        for _ in range(20):
+            self.assertNotContains(self.client.get(reverse("quotes:home")), "Рукописи не горят")
+
+        build_snapshot()
+        snap = self._current_snapshot()
+        self.assertIsNone(snap.index_of(self.first.pk))
+
+        path.write_bytes(b"QSNP\x01\x00")  # недописанный файл или старый формат
+        self.assertIsNone(self._current_snapshot())
+
+    def test_empty_catalogue(self):
+        Quote.objects.all().delete()
+        count, snap = self._build()
+        self.assertEqual((count, len(snap), snap.total_weight), (0, 0, 0))
+        self.assertIsNone(snap.pick())
+
+
+class SeenFilterTests(SimpleTestCase):
+    def test_dumps_loads_round_trip(self):
+        seen = SeenFilter()
+        for quote_id in (1, 42, 10**9):
+            seen.add(quote_id)
+        restored = SeenFilter.loads(seen.dumps())
+        self.assertEqual(restored.count, 3)
+        self.assertTrue(all(quote_id in restored for quote_id in (1, 42, 10**9)))
+        self.assertEqual(restored.dumps(), seen.dumps())
+
+    def test_bad_cookie_gives_empty_filter(self):
+        raw = base64.urlsafe_b64decode(SeenFilter().dumps() + "==")
+        wrong_version = base64.urlsafe_b64encode(b"\x09" + raw[1:]).decode()
+        for value in (None, "", "%%%", "AAAA", SeenFilter().dumps()[:-10], wrong_version):
+            restored = SeenFilter.loads(value)
+            self.assertEqual((restored.count, bytes(restored.current)), (0, bytes(SeenFilter().current)))
+
+    def test_full_filter_rotates_into_previous(self):
+        seen = SeenFilter()
+        for quote_id in range(CAPACITY + 1):
+            seen.add(quote_id)
+        self.assertEqual(seen.count, 1)
+        self.assertIn(0, seen)
+        self.assertIn(CAPACITY, seen)
+        for quote_id in range(CAPACITY + 1, 2 * CAPACITY + 1):
+            seen.add(quote_id)
+        # первая сотня ушла вместе со старым «предыдущим» фильтром
+        self.assertLess(sum(quote_id in seen for quote_id in range(CAPACITY)), 10)
+
+    def test_pick_unseen_skips_seen_and_reports_exhaustion(self):
+        ids, weights = [10, 20, 30], [1, 100, 1]
+        cum_weights = [1, 101, 102]
+        seen = SeenFilter()
+        seen.add(20)
+        rng = random.Random(0)
+        for _ in range(20):
+            self.assertNotEqual(pick_unseen_index(cum_weights, weights, ids.__getitem__, seen, rng), 1)
+        seen.add(10)
+        seen.add(30)
+        self.assertIsNone(pick_unseen_index(cum_weights, weights, ids.__getitem__, seen, rng))
+        self.assertIsNone(pick_unseen_index([], [], ids.__getitem__, None, rng))
+
+
+class ResourceSignalTests(TestCase):
+    def _version(self, name):
+        return ResourceVersion.objects.filter(name=name).values_list("version", flat=True).first() or 0
+
+    def test_resource_models_bump_their_version(self):
+        before = self._version("tags")
+        tag = Tag.objects.create(name="драма")
+        tag.delete()
+        self.assertEqual(self._version("tags"), before + 2)
+
+    def test_other_models_keep_fast_delete_and_bump_nothing(self):
+        versions = list(ResourceVersion.objects.values_list("name", "version"))
+        enqueue("test_ok")
+        self.assertEqual(list(ResourceVersion.objects.values_list("name", "version")), versions)
+        for model in (ModerationLog, Job):
+            self.assertTrue(Collector(using="default", origin=None).can_fast_delete(model.objects.all()))
+
+
+class ConditionalPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.moderator = get_user_model().objects.create_user("moderator", password="pw", is_staff=True)
+        source = Source.objects.create(name="Мастер и Маргарита", status=Source.Status.APPROVED)
+        cls.quote = Quote.objects.create(
+            text="Рукописи не горят.", source=source, status=Quote.Status.APPROVED, author=cls.moderator,
+        )
+        cls.draft = Quote.objects.create(text="Ещё не проверено.", source=source, author=cls.moderator)
+        cls.pending = Source.objects.create(name="Черновик романа")
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("quotes:top")
+
+    def _etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def _revalidate(self, etag):
+        return self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_page_is_not_modified(self):
+        etag = self._etag()
+        response = self._revalidate(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("public", response["Cache-Control"])
+
+    def test_like_changes_etag(self):
+        etag = self._etag()
+        self.client.post(reverse("quotes:react", args=[self.quote.pk]), {"action": "like"})
+        response = self._revalidate(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_moderation_action_changes_etag(self):
+        self.client.login(username="moderator", password="pw")
+        etag = self._etag()
+        self.client.post(reverse("quotes:moderation_quote_reject", args=[self.draft.pk]))
+        self.assertEqual(self._revalidate(etag).status_code, 200)  # заодно показывает «Цитата отклонена.»
+        self.assertNotEqual(self._etag(), etag)
+        self.assertEqual(self._revalidate(etag).status_code, 200)
+
+    def test_pending_flash_message_gets_full_page(self):
+        self.client.login(username="moderator", password="pw")
+        self.client.get(self.url)  # первый ответ ставит csrf-cookie, а она входит в ETag
+        etag = self._etag()
+        # пустое имя цели: только сообщение об ошибке, версии ресурсов не меняются
+        self.client.post(reverse("quotes:moderation_source_merge", args=[self.pending.pk]), {"target_name": ""})
+        response = self._revalidate(etag)
+        self.assertContains(response, "Укажите корректное название")
+        self.assertNotIn("ETag", response)
+        self.assertEqual(self._revalidate(etag).status_code, 304)
+
+    def test_random_batch_validates_n(self):
+        url = reverse("quotes:random_batch")
+        for n in ("²", "٣٣٣", "0", "51", "-1", "abc"):
+            with self.subTest(n=n):
+                self.assertEqual(self.client.get(url, {"n": n}).status_code, 400)
+        response = self.client.get(url, {"n": "5"})
+        self.assertEqual([q["id"] for q in response.json()["quotes"]], [self.quote.pk])
+
+    def test_non_decimal_tag_is_ignored(self):
+        for tag in ("²", "abc", "-1"):
+            self.assertEqual(self.client.get(self.url, {"tag": tag}).status_code, 200)
+
+    def test_seen_cookie_stays_on_home_path(self):
+        self.assertRedirects(self.client.get("/"), reverse("quotes:home"))
+        self.client.cookies["seen"] = "legacy"
+        response = self.client.get(reverse("quotes:home"))
+        self.assertEqual(response.cookies["recent"]["path"], reverse("quotes:home"))
+        self.assertEqual(response.cookies["seen"]["max-age"], 0)
+
+        top = self.client.get(self.url)
+        self.assertEqual(dict(top.cookies), {})
+        self.assertIn("public", top["Cache-Control"])
+
+    def test_authenticated_responses_are_private(self):
+        self.client.login(username="moderator", password="pw")
+        for response in (self.client.get(self.url), self._revalidate(self._etag())):
+            cache_control = response["Cache-Control"]
+            self.assertIn("private", cache_control)
+            self.assertNotIn("public", cache_control)
+            self.assertIn("Cookie", response["Vary"])
+
+
+class StaticFilesMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = Path(tmp.name)
+        (root / "base.0123456789ab.css").write_text("body{}")
+        (root / "base.0123456789ab.css.gz").write_bytes(gzip.compress(b"body{}"))
+        (root / "base.0123456789ab.css.br").write_bytes(b"br")
+        override = override_settings(STATIC_ROOT=root, STATIC_URL="/static/")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.middleware = StaticFilesMiddleware(lambda request: HttpResponse(status=404))
+
+    def _get(self, accept):
+        request = RequestFactory().get("/static/base.0123456789ab.css", HTTP_ACCEPT_ENCODING=accept)
+        response = self.middleware(request)
+        self.addCleanup(response.close)
+        return response
+
+    def test_accept_encoding_q_values(self):
+        self.assertEqual(accepted_encodings("gzip;q=0, br ; q=0.5,*;q=0.1"), {"gzip": 0.0, "br": 0.5, "*": 0.1})
+        cases = {
+            "gzip, deflate, br": "br",
+            "gzip": "gzip",
+            "gzip;q=0": None,
+            "br;q=0, gzip": "gzip",
+            "br;q=0.5, gzip;q=0.8": "gzip",
+            "*": "br",
+            "*, br;q=0": "gzip",
+            "identity": None,
+            "": None,
+        }
+        for accept, expected in cases.items():
+            with self.subTest(accept=accept):
+                self.assertEqual(self._get(accept).get("Content-Encoding"), expected)
+
+    def test_no_content_disposition_for_compressed_copy(self):
+        response = self._get("gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertNotIn("Content-Disposition", response)
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), b"body{}")
+        self.assertIn("immutable", response["Cache-Control"])
+
+
+class ModerationDerivedWorkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        moderator = get_user_model().objects.create_user("moderator", password="pw", is_staff=True)
+        source = Source.objects.create(name="Мастер и Маргарита", status=Source.Status.APPROVED)
+        cls.draft = Quote.objects.create(text="Ещё не проверено.", source=source, author=moderator)
+
+    def _moderate(self):
+        self.client.login(username="moderator", password="pw")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("quotes:moderation_quote_reject", args=[self.draft.pk]))
+        return set(Job.objects.values_list("name", flat=True))
+
+    def test_no_cache_warmup_with_per_process_cache(self):
+        self.assertEqual(self._moderate(), {"optimize_db"})
+
+    def test_cache_warmup_with_shared_cache(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        shared = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": tmp.name}}
+        with override_settings(CACHES=shared):
+            self.assertIn("warm_caches", self._moderate())
+
+
+class SmallEstimatedPaginator(EstimatedCountPaginator):
+    exact_limit = 5
+    sample_size = 30
+    sample_windows = 3
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # каждая третья задача — failed: 30 строк, 10 подходят под фильтр
+        Job.objects.bulk_create(
+            Job(name="test_ok", status=Job.Status.FAILED if i % 3 == 0 else Job.Status.DONE) for i in range(30)
+        )
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def test_exact_count_up_to_limit(self):
+        first = Job.objects.order_by("pk").values_list("pk", flat=True)[:4]
+        paginator = SmallEstimatedPaginator(Job.objects.filter(pk__in=list(first)), per_page=2)
+        self.assertEqual((paginator.count, paginator.estimated), (4, False))
+        with self.assertRaises(EmptyPage):
+            paginator.page(3)
+
+    def test_estimate_from_statistics_past_limit(self):
+        paginator = SmallEstimatedPaginator(Job.objects.all(), per_page=5)
+        self.assertEqual((paginator.count, paginator.estimated), (30, True))
+
+    def test_filtered_estimate_uses_selectivity(self):
+        paginator = SmallEstimatedPaginator(Job.objects.filter(status=Job.Status.FAILED), per_page=5)
+        self.assertEqual((paginator.count, paginator.estimated), (10, True))
+
+    def test_pages_past_estimate_are_empty_not_errors(self):
+        paginator = SmallEstimatedPaginator(Job.objects.filter(status=Job.Status.FAILED).order_by("pk"), per_page=5)
+        self.assertEqual(len(paginator.page(2).object_list), 5)
+        self.assertEqual(list(paginator.page(100).object_list), [])
+        for number in (0, -1, "x"):
+            with self.assertRaises(InvalidPage):
+                paginator.page(number)
+
+
+class SearchQuotesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = get_user_model().objects.create_user("author")
+        source = Source.objects.create(name="Мастер и Маргарита")
+        cls.manuscripts = Quote.objects.create(text="Рукописи не горят.", source=source, author=author)
+        cls.ask = Quote.objects.create(text="Никогда и ничего не просите.", source=source, author=author)
+
+    def _search(self, term):
+        return set(search_quotes(Quote.objects.all(), term))
+
+    def test_word_prefixes_match_through_fts(self):
+        self.assertEqual(self._search("рукоп"), {self.manuscripts})
+        self.assertEqual(self._search("не гор"), {self.manuscripts})
+        self.assertEqual(self._search("не"), {self.manuscripts, self.ask})
+        self.assertEqual(self._search("горят рукописи"), {self.manuscripts})
+        self.assertEqual(self._search("мастер"), set())
+
+    def test_fts_follows_text_updates(self):
+        self.ask.text = "Никогда ни о чём не просите."
+        self.ask.save()
+        self.assertEqual(self._search("ничего"), set())
+        self.assertEqual(self._search("чём"), {self.ask})
+
+    def test_special_terms(self):
+        self.assertEqual(self._search(str(self.ask.pk)), {self.ask})
+        self.assertEqual(self._search("   "), {self.manuscripts, self.ask})
+        self.assertEqual(self._search('"рукописи" OR *'), set())
+        self.assertEqual(self._search("²"), set())
+
+
+class ArchiveModerationLogsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.moderator = get_user_model().objects.create_user("moderator")
+        source = Source.objects.create(name="Мастер и Маргарита")
+        cls.quote = Quote.objects.create(text="Рукописи не горят.", source=source, author=cls.moderator)
+        cls.old_at = timezone.now() - timedelta(days=200)
+        cls.old = [
+            cls._log(cls.moderator, ModerationLog.Action.APPROVE, cls.old_at),
+            cls._log(cls.moderator, ModerationLog.Action.APPROVE, cls.old_at),
+            cls._log(None, ModerationLog.Action.REJECT, cls.old_at, reason="дубль «Мастера»"),
+        ]
+        cls.middle = cls._log(cls.moderator, ModerationLog.Action.REJECT, timezone.now() - timedelta(days=100))
+        cls.fresh = cls._log(cls.moderator, ModerationLog.Action.APPROVE, timezone.now() - timedelta(days=1))
+
+    @classmethod
+    def _log(cls, moderator, action, created_at, reason=""):
+        log = ModerationLog.objects.create(quote=cls.quote, moderator=moderator, action=action, reason=reason)
+        ModerationLog.objects.filter(pk=log.pk).update(created_at=created_at)
+        return log
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.out_dir = Path(tmp.name)
+
+    def _archive(self, *args):
+        out = StringIO()
+        call_command("archive_moderation_logs", *args, output_dir=self.out_dir, pause=0, batch_size=2, stdout=out)
+        return out.getvalue()
+
+    def _archived_rows(self):
+        rows = []
+        for path in sorted(self.out_dir.glob("*.jsonl.gz")):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                rows.extend(json.loads(line) for line in f)
+        return rows
+
+    def _stats(self):
+        return {(s.moderator_id, s.action, s.day): s.count for s in ModerationStat.objects.all()}
+
+    def test_retention_days_cutoff(self):
+        self._archive("--days", "180")
+        self.assertEqual(set(ModerationLog.objects.values_list("pk", flat=True)), {self.middle.pk, self.fresh.pk})
+
+        rows = self._archived_rows()
+        self.assertEqual(sorted(row["id"] for row in rows), sorted(log.pk for log in self.old))
+        rejected = next(row for row in rows if row["moderator_id"] is None)
+        self.assertEqual(
+            (rejected["quote_id"], rejected["action"], rejected["reason"]),
+            (self.quote.pk, "reject", "дубль «Мастера»"),
+        )
+        self.assertEqual(rejected["created_at"], self.old_at.isoformat())
+
+    def test_before_date(self):
+        before = timezone.localdate() - timedelta(days=50)
+        self._archive("--before", before.isoformat())
+        self.assertEqual(list(ModerationLog.objects.values_list("pk", flat=True)), [self.fresh.pk])
+        self.assertEqual(len(self._archived_rows()), 4)
+
+    def test_bad_before_date(self):
+        with self.assertRaises(CommandError):
+            self._archive("--before", "вчера")
+
+    def test_stats_merge_across_runs(self):
+        day = timezone.localdate(self.old_at)
+        self._archive("--days", "180")
+        self.assertEqual(self._stats(), {(self.moderator.pk, "approve", day): 2, (None, "reject", day): 1})
+
+        self._log(self.moderator, ModerationLog.Action.APPROVE, self.old_at)
+        self._log(None, ModerationLog.Action.REJECT, self.old_at)
+        self._archive("--days", "180")
+        self.assertEqual(self._stats(), {(self.moderator.pk, "approve", day): 3, (None, "reject", day): 2})
+        self.assertEqual(len(self._archived_rows()), 5)
+
+    def test_nothing_to_archive_leaves_no_file(self):
+        self.assertIn("Нечего архивировать", self._archive("--days", "365"))
+        self.assertEqual(list(self.out_dir.iterdir()), [])
+
+    def test_dry_run_deletes_nothing(self):
+        out = self._archive("--days", "180", "--dry-run")
+        self.assertIn("3 строк", out)
+        self.assertEqual(ModerationLog.objects.count(), 5)
+        self.assertFalse(ModerationStat.objects.exists())
+        self.assertEqual(list(self.out_dir.iterdir()), [])
+
+
+def prefix_distance(key, query):
+    """Наименьшее расстояние Левенштейна от query до какого-либо префикса key — полным DP."""
+    row = list(range(len(query) + 1))
+    best = row[-1]
+    for i, char in enumerate(key, 1):
+        prev, row = row, [i] + [0] * len(query)
+        for j in range(1, len(query) + 1):
+            row[j] = min(row[j - 1] + 1, prev[j] + 1, prev[j - 1] + (query[j - 1] != char))
+        best = min(best, row[-1])
+    return best
+
+
+class SourceIndexTests(SimpleTestCase):
+    NAMES = ["Мастер и Маргарита", "Мастер и Маргарита (фильм)", "Маленький принц", "Матрица", "Мёртвые души"]
+
+    def setUp(self):
+        self.index = SourceIndex((i, name, " ".join(name.split()).lower()) for i, name in enumerate(self.NAMES))
+
+    def _names(self, query, limit=10):
+        return [name for _, name in self.index.suggest(query, limit)]
+
+    def test_name_prefix(self):
+        self.assertEqual(self._names("мас"), ["Мастер и Маргарита", "Мастер и Маргарита (фильм)"])
+        self.assertEqual(self._names("  МАСТЕР   и "), ["Мастер и Маргарита", "Мастер и Маргарита (фильм)"])
+        self.assertEqual(self._names("ма", limit=2), ["Маленький принц", "Мастер и Маргарита"])
+
+    def test_word_prefix_after_name_prefix(self):
+        self.assertEqual(self._names("принц"), ["Маленький принц"])
+        self.assertEqual(self._names("души"), ["Мёртвые души"])
+        # сначала совпадения с начала имени, потом — по слову, без повторов
+        self.assertEqual(self._names("м", limit=10)[:5], sorted(self.NAMES, key=str.lower))
+        self.assertEqual(len(self._names("м", limit=10)), 5)
+
+    def test_typo_only_when_no_prefix_matches(self):
+        self.assertEqual(self._names("матрца"), ["Матрица"])
+        self.assertEqual(self._names("мостер"), ["Мастер и Маргарита", "Мастер и Маргарита (фильм)"])
+        self.assertEqual(self._names("мостер", limit=1), ["Мастер и Маргарита"])
+        self.assertEqual(self._names("мтр"), [])  # короче FUZZY_MIN_LENGTH — без опечаток
+        self.assertEqual(self._names("абракадабра"), [])
+
+    def test_empty_query_and_index(self):
+        self.assertEqual(self._names(""), [])
+        self.assertEqual(self._names("   "), [])
+        self.assertEqual(SourceIndex([]).suggest("мастер"), [])
+
+    def test_fuzzy_ranges_match_brute_force(self):
+        rng = random.Random(38)
+        alphabet = "абвгд "
+        for case in range(300):
+            keys = {
+                " ".join("".join(rng.choice(alphabet[:-1]) for _ in range(rng.randint(1, 4))) for _ in range(2)).strip()
+                for _ in range(rng.randint(1, 40))
+            }
+            index = SourceIndex((i, key, key) for i, key in enumerate(sorted(keys)))
+            base = rng.choice(index.keys)[: rng.randint(1, 7)]
+            edit = rng.randrange(4)
+            pos = rng.randrange(len(base) + 1)
+            char = rng.choice(alphabet)
+            query = [
+                base,
+                base[:pos] + char + base[pos:],
+                base[:pos] + base[pos + 1:],
+                base[:pos] + char + base[pos + 1:],
+            ][edit].strip() or "а"
+
+            found = set()
+            for distance, lo, hi in index._fuzzy_ranges(query, FUZZY_MAX_TYPOS):
+                self.assertLessEqual(distance, FUZZY_MAX_TYPOS)
+                found.update(index.keys[lo:hi])
+            expected = {key for key in index.keys if prefix_distance(key, query) <= FUZZY_MAX_TYPOS}
+            self.assertEqual(found, expected, f"случай {case}: {query!r}")
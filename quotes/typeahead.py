@@ -0,0 +1,139 @@
+"""
+Подсказки источников в форме добавления цитаты.
+
+Индекс живёт в памяти процесса: отсортированный массив нормализованных имён
+утверждённых источников и такой же массив слов внутри имён («маргарита» находит
+«мастер и маргарита»). Префикс — два bisect по массиву. Опечатки ищутся обходом
+неявного префиксного дерева поверх того же массива: узел — диапазон ключей с
+общим префиксом, дети — следующие различные символы; ветка отсекается, как
+только расстояние Левенштейна до запроса больше одной правки. Этот обход —
+только если точный префикс не нашёл ничего, и не дальше FUZZY_MAX_NODES узлов.
+
+Индекс пересобирается, когда меняется версия ресурса "source_names" — её
+поднимают сигналы, когда источник утверждают, отклоняют, сливают или
+переименовывают утверждённый (новые pending-источники её не трогают).
+Версия проверяется не чаще раза в CHECK_INTERVAL.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Iterable, List, Tuple
+
+from .models import Source, normalize_source_name
+from .search import PREFIX_MAX
+from .services import resource_versions
+
+CHECK_INTERVAL = 1.0  # как часто (сек) процесс сверяет версию "source_names"
+QUERY_MAX_LENGTH = 64
+FUZZY_MIN_LENGTH = 4  # короче — опечатку не отличить от другого слова
+FUZZY_MAX_TYPOS = 1
+FUZZY_MAX_NODES = 2000  # потолок обхода: запрос-«мусор» не должен стоить десятков мс
+
+
+class SourceIndex:
+    def __init__(self, rows: Iterable[Tuple[int, str, str]]):
+        """rows — (id, name, name_normalized) утверждённых источников."""
+        entries = sorted(rows, key=lambda row: row[2])
+        self.ids = [row[0] for row in entries]
+        self.names = [row[1] for row in entries]
+        self.keys = [row[2] for row in entries]
+        words = sorted((word, i) for i, key in enumerate(self.keys) for word in key.split()[1:])
+        self.word_keys = [word for word, _ in words]
+        self.word_refs = [i for _, i in words]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def suggest(self, query: str, limit: int = 10) -> List[Tuple[int, str]]:
+        """(id, name): префикс имени, затем префикс слова в имени; если пусто — с одной опечаткой."""
+        query = normalize_source_name(query[:QUERY_MAX_LENGTH])
+        if not query:
+            return []
+        found, seen = [], set()
+
+        def take(i):
+            if i not in seen:
+                seen.add(i)
+                found.append(i)
+            return len(found) >= limit
+
+        for i in range(*_prefix_range(self.keys, query)):
+            if take(i):
+                break
+        if len(found) < limit:
+            for j in range(*_prefix_range(self.word_keys, query)):
+                if take(self.word_refs[j]):
+                    break
+        if not found and len(query) >= FUZZY_MIN_LENGTH:
+            for _, lo, hi in sorted(self._fuzzy_ranges(query, FUZZY_MAX_TYPOS)):
+                if any(take(i) for i in range(lo, hi)):
+                    break
+        return [(self.ids[i], self.names[i]) for i in found]
+
+    def _fuzzy_ranges(self, query: str, k: int) -> List[Tuple[int, int, int]]:
+        """
+        (расстояние, lo, hi): у всех ключей keys[lo:hi] есть префикс на расстоянии
+        Левенштейна <= k от запроса. Диапазоны могут вкладываться друг в друга.
+        После FUZZY_MAX_NODES узлов обход останавливается с тем, что успел найти.
+        """
+        keys, out, n = self.keys, [], len(query)
+        budget = [FUZZY_MAX_NODES]
+
+        def walk(prefix, lo, hi, prev_row, best):
+            depth = len(prefix)
+            i = lo
+            while i < hi and budget[0] > 0:
+                budget[0] -= 1
+                key = keys[i]
+                if len(key) == depth:  # ключ равен префиксу — детей у него нет
+                    i += 1
+                    continue
+                char = key[depth]
+                j = bisect_left(keys, prefix + char + PREFIX_MAX, i, hi)
+                # считаем только полосу |col - depth| <= k: остальные клетки заведомо > k
+                row = [k + 1] * (n + 1)
+                row[0] = min(depth + 1, k + 1)
+                lo_col, hi_col = max(1, depth + 1 - k), min(n, depth + 1 + k)
+                for col in range(lo_col, hi_col + 1):
+                    row[col] = min(
+                        row[col - 1] + 1, prev_row[col] + 1, prev_row[col - 1] + (query[col - 1] != char), k + 1,
+                    )
+                if row[n] <= k and row[n] < best:
+                    out.append((row[n], i, j))
+                # глубже расстояние не меньше минимума полосы: спускаемся, только если можно улучшить
+                if min(row[max(0, lo_col - 1):hi_col + 1]) < best:
+                    walk(prefix + char, i, j, row, min(best, row[n]))
+                i = j
+
+        walk("", 0, len(keys), [min(col, k + 1) for col in range(n + 1)], k + 1)
+        return out
+
+
+def _prefix_range(keys: List[str], prefix: str) -> Tuple[int, int]:
+    return bisect_left(keys, prefix), bisect_left(keys, prefix + PREFIX_MAX)
+
+
+def build_source_index() -> SourceIndex:
+    return SourceIndex(
+        Source.objects.filter(status=Source.Status.APPROVED).values_list("id", "name", "name_normalized")
+    )
+
+
+_lock = threading.Lock()
+_current = None  # (SourceIndex, версия "source_names")
+_checked_at = 0.0
+
+
+def get_source_index() -> SourceIndex:
+    """Индекс процесса; раз в CHECK_INTERVAL сверяет версию "source_names" и пересобирается после изменений."""
+    global _current, _checked_at
+    now = time.monotonic()
+    if _current is not None and now - _checked_at < CHECK_INTERVAL:
+        return _current[0]
+    with _lock:
+        _checked_at = now
+        # версию читаем до выборки: изменение между ними лишь вызовет ещё одну пересборку
+        version = resource_versions(["source_names"]).get("source_names", (0, None))[0]
+        if _current is None or _current[1] != version:
+            _current = (build_source_index(), version)
+        return _current[0]
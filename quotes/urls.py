@@ -1,4 +1,5 @@
 from django.urls import path
+from django.views.generic import RedirectView
 from django.contrib.auth import views as auth_views
 from . import views
 from .views import register
@@ -6,9 +7,13 @@ from . import views_moderation
 app_name = "quotes"
 
 urlpatterns = [
-    path("", views.home, name="home"),
+    # у главной свой путь: на нём живёт cookie просмотренных цитат (см. views.SEEN_COOKIE)
+    path("", RedirectView.as_view(pattern_name="quotes:home"), name="root"),
+    path("quote/", views.home, name="home"),
     path("add/", views.add_quote, name="add"),
     path("top/", views.top10, name="top"),
+    path("random/", views.random_batch, name="random_batch"),
+    path("sources/suggest/", views.source_suggest, name="source_suggest"),
     path("<int:pk>/react/", views.react, name="react"),
     path("register/", register, name="register"),
     path("login/", auth_views.LoginView.as_view(template_name="quotes/login.html"), name="login"),
@@ -21,4 +26,11 @@ urlpatterns = [
     path("moderation/sources/<int:pk>/merge/", views_moderation.merge_source, name="moderation_source_merge"),
     path("moderation/users/", views_moderation.users, name="moderation_users"),
     path("moderation/tag/add/", views_moderation.add_tag, name="add_tag"),
+    path("moderation/profiles/", views_moderation.profiles, name="moderation_profiles"),
+    path("moderation/profiles/<str:profile_id>/", views_moderation.profile_detail, name="moderation_profile"),
+    path(
+        "moderation/profiles/<str:profile_id>/<str:kind>/",
+        views_moderation.profile_download,
+        name="moderation_profile_download",
+    ),
 ]
\ No newline at end of file
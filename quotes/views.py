@@ -1,21 +1,51 @@
 from django.contrib.auth.forms import UserCreationForm
-from django.http import Http404, HttpResponseBadRequest
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from .models import Quote, Tag
+from django.utils.cache import patch_cache_control
+from .models import Quote
 from .forms import QuoteCreateForm
-from .services import pick_weighted_random_quote, register_view, register_reaction, top_quotes
+from .http_cache import cache_control_for, conditional_page
+from .sampling import SeenFilter
+from .snapshot import get_snapshot
+from .typeahead import get_source_index
+from .services import (
+    all_tags,
+    cached_top_quotes,
+    pick_weighted_random_quote,
+    random_quotes,
+    register_reaction,
+    register_view,
+)
 from django.contrib.auth import login
 from django.urls import reverse
 from django.db import IntegrityError
+
+# cookie меняется на каждом показе, поэтому живёт только на пути главной: с path=/ она
+# уходила бы и на /top/, а Vary: Cookie делил бы общий кэш по каждому посетителю и показу
+SEEN_COOKIE = "recent"
+SEEN_COOKIE_MAX_AGE = 30 * 24 * 3600
+LEGACY_SEEN_COOKIE = "seen"  # прежняя cookie с path=/ — удаляется при первом заходе
+RANDOM_BATCH_DEFAULT = 10
+RANDOM_BATCH_MAX = 50
+SOURCE_SUGGEST_LIMIT = 10
+
+
 @require_http_methods(["GET"])
 def home(request):
-    quote = pick_weighted_random_quote()
+    seen = SeenFilter.loads(request.COOKIES.get(SEEN_COOKIE))
+
+    # снимок каталога (mmap) выбирает цитату без запросов; нет снимка — идём в БД
+    snapshot = get_snapshot()
+    quote = snapshot.pick(seen=seen) if snapshot is not None else None
+    if quote is None:
+        quote = pick_weighted_random_quote(seen=seen)
 
     if quote:
         register_view(quote)
+        seen.add(quote.pk)
 
     context = {
         "quote": quote,
@@ -24,7 +54,51 @@ def home(request):
                 and (request.user.is_staff or request.user.groups.filter(name="Moderator").exists())
         )
     }
-    return render(request, "quotes/home.html", context)
+    response = render(request, "quotes/home.html", context)
+    response.set_cookie(
+        SEEN_COOKIE, seen.dumps(), max_age=SEEN_COOKIE_MAX_AGE, path=reverse("quotes:home"), httponly=True, samesite="Lax",
+    )
+    if LEGACY_SEEN_COOKIE in request.COOKIES:
+        response.delete_cookie(LEGACY_SEEN_COOKIE, samesite="Lax")
+    return response
+
+
+@require_http_methods(["GET"])
+def random_batch(request):
+    """JSON-лента из n разных случайных цитат (по весам) за один запрос: ?n=10, не больше 50."""
+    raw = request.GET.get("n") or str(RANDOM_BATCH_DEFAULT)
+    if not raw.isdecimal() or not 1 <= int(raw) <= RANDOM_BATCH_MAX:
+        return HttpResponseBadRequest(f"n должно быть от 1 до {RANDOM_BATCH_MAX}")
+
+    quotes = random_quotes(int(raw))
+    data = [
+        {
+            "id": q.id,
+            "text": q.text,
+            "source": q.source.name,
+            "weight": q.weight,
+            "views": q.views,
+            "likes": q.likes,
+            "dislikes": q.dislikes,
+            "tags": [t.name for t in q.tags.all()],
+        }
+        for q in quotes
+    ]
+    response = JsonResponse({"quotes": data}, json_dumps_params={"ensure_ascii": False})
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+@require_http_methods(["GET"])
+def source_suggest(request):
+    """Подсказки утверждённых источников для поля «Источник»: ?q=мастер и м."""
+    suggestions = get_source_index().suggest(request.GET.get("q", ""), SOURCE_SUGGEST_LIMIT)
+    response = JsonResponse(
+        {"sources": [{"id": pk, "name": name} for pk, name in suggestions]},
+        json_dumps_params={"ensure_ascii": False},
+    )
+    patch_cache_control(response, **cache_control_for("quotes:source_suggest", request))
+    return response
 
 
 @require_http_methods(["POST"])
@@ -64,24 +138,19 @@ def add_quote(request):
 
 
 @require_http_methods(["GET"])
+@conditional_page("quotes:top", "quotes", "sources", "tags")
 def top10(request):
-    tag_id = request.GET.get("tag")
-
-    quotes = Quote.objects.filter(status=Quote.Status.APPROVED)
-
-    if tag_id:
-        quotes = quotes.filter(tags__id=tag_id)
-
-    quotes = quotes.order_by("-likes")[:10]
-    tags = Tag.objects.all()
+    tag_param = request.GET.get("tag") or ""
+    # isdecimal, а не isdigit: "²" — цифра, но int() её не примет
+    tag_id = int(tag_param) if tag_param.isdecimal() else None
 
     return render(
         request,
         "quotes/top10.html",
         {
-            "quotes": quotes,
-            "tags": tags,
-            "selected_tag": int(tag_id) if tag_id else None,
+            "quotes": cached_top_quotes(10, tag_id=tag_id),
+            "tags": all_tags(),
+            "selected_tag": tag_id,
         }
     )
 
@@ -2,19 +2,36 @@ from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth import get_user_model
 from django.contrib import messages
 from django.db import transaction
+from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_http_methods
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 from .models import Quote, Source, ModerationLog, Tag, normalize_source_name
+from .cache import cache_is_shared
 from .forms import ModeratorQuoteApproveForm
+from .http_cache import conditional_page
+from .jobs import enqueue_on_commit
+from .profiling import list_profiles, load_profile, profile_file
 
 User = get_user_model()
 
 def is_moderator(u):
     return u.is_authenticated and (u.is_staff or u.groups.filter(name="Moderator").exists())
 
+
+def _schedule_derived_work():
+    """
+    Производная работа после модерации — в фоне, после коммита, по одной задаче каждого вида.
+    Снимок главной пересобирается из quotes.signals при любом изменении, не только отсюда.
+    """
+    # прогрев в locmem воркера не виден ни одному веб-процессу
+    if cache_is_shared():
+        enqueue_on_commit("warm_caches", dedupe_key="warm_caches")
+    enqueue_on_commit("optimize_db", dedupe_key="optimize_db", delay=600)
+
 @user_passes_test(is_moderator)
+@conditional_page("quotes:moderation_queue", "quotes", "sources", "tags")
 def queue(request):
     """О модерации: цитаты (draft) и источники (pending)."""
     quotes_qs = (
@@ -69,6 +86,7 @@ def approve_quote(request, pk: int):
     ModerationLog.objects.create(
         quote=q, moderator=request.user, action=ModerationLog.Action.APPROVE
     )
+    _schedule_derived_work()
     messages.success(request, "Цитата утверждена.")
     return redirect("quotes:moderation_queue")
 
@@ -85,6 +103,7 @@ def reject_quote(request, pk: int):
     ModerationLog.objects.create(
         quote=quote, moderator=request.user, action=ModerationLog.Action.REJECT, reason=reason
     )
+    _schedule_derived_work()
     messages.info(request, "Цитата отклонена.")
     return redirect("quotes:moderation_queue")
 
@@ -95,6 +114,7 @@ def approve_source(request, pk: int):
     s.status = Source.Status.APPROVED
     s.approved_by = request.user
     s.save()
+    _schedule_derived_work()
     messages.success(request, "Источник утверждён.")
     return redirect("quotes:moderation_queue")
 
@@ -105,6 +125,7 @@ def reject_source(request, pk: int):
     s.status = Source.Status.REJECTED
     s.approved_by = request.user
     s.save()
+    _schedule_derived_work()
     messages.info(request, "Источник отклонён.")
     return redirect("quotes:moderation_queue")
 
@@ -155,6 +176,7 @@ def merge_source(request, pk: int):
     s.status = Source.Status.REJECTED
     s.approved_by = request.user
     s.save(update_fields=["merged_into", "status", "approved_by"])
+    _schedule_derived_work()
 
     messages.success(
         request,
@@ -164,6 +186,7 @@ def merge_source(request, pk: int):
     return redirect("quotes:moderation_queue")
 
 @user_passes_test(is_moderator)
+@conditional_page("quotes:moderation_users", "users", "quotes", "sources")
 def users(request):
     """Список всех пользователей + их цитаты."""
     users_qs = User.objects.all().order_by("-date_joined")
@@ -197,4 +220,31 @@ def add_tag(request):
     else:
         Tag.objects.get_or_create(name=name)
         messages.success(request, f"Тег «{name}» добавлен.")
-    return redirect("quotes:moderation_queue")
\ No newline at end of file
+    return redirect("quotes:moderation_queue")
+
+
+@user_passes_test(is_moderator)
+def profiles(request):
+    """Последние профили запросов (?__profile=1)."""
+    return render(request, "quotes/moderation_profiles.html", {"profiles": list_profiles()})
+
+
+@user_passes_test(is_moderator)
+def profile_detail(request, profile_id: str):
+    profile = load_profile(profile_id)
+    if profile is None:
+        raise Http404("Профиль не найден")
+    return render(request, "quotes/moderation_profile.html", {
+        "profile": profile,
+        "has_folded": profile_file(profile_id, ".folded") is not None,
+        "has_prof": profile_file(profile_id, ".prof") is not None,
+    })
+
+
+@user_passes_test(is_moderator)
+def profile_download(request, profile_id: str, kind: str):
+    suffix = {"folded": ".folded", "prof": ".prof"}.get(kind)
+    path = profile_file(profile_id, suffix) if suffix else None
+    if path is None:
+        raise Http404("Файл профиля не найден")
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=path.name)
@@ -0,0 +1,27 @@
+"""
+Точки входа для процессов пула `manage.py run_workers`.
+
+Модуль не импортирует модели на верхнем уровне: spawn-процесс загружает его
+до django.setup().
+"""
+import os
+import signal
+
+
+def init_worker(settings_module):
+    import django
+
+    os.environ["DJANGO_SETTINGS_MODULE"] = settings_module
+    django.setup()
+    # Ctrl+C обрабатывает родитель, дети дорабатывают текущую задачу
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def execute(job_id):
+    from django.db import connections
+    from quotes.jobs import run_job
+
+    try:
+        return run_job(job_id)
+    finally:
+        connections.close_all()
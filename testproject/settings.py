@@ -43,17 +43,20 @@ INSTALLED_APPS = [
         "django.contrib.humanize",
 ]
 
-LOGIN_REDIRECT_URL = "/"
-LOGOUT_REDIRECT_URL = "/"
+LOGIN_REDIRECT_URL = "quotes:home"
+LOGOUT_REDIRECT_URL = "quotes:home"
 LOGIN_URL = '/login/'
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'quotes.middleware.StaticFilesMiddleware',
+    'quotes.middleware.ThresholdGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'quotes.middleware.ProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'testproject.urls'
@@ -83,11 +86,73 @@ WSGI_APPLICATION = 'testproject.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv("DJANGO_DB_PATH", BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            # atomic-блоки сразу берут блокировку на запись: иначе транзакция, которая
+            # сначала читает, а потом пишет, мгновенно падает с «database is locked»
+            # вместо ожидания (видно в manage.py loadtest на модерации)
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# QUOTES_CACHE_BACKEND:
+#   locmem   — память процесса (по умолчанию, у каждого воркера своя копия);
+#   file     — каталог на диске, общий для воркеров одной машины;
+#   database — таблица в БД, общая для всех воркеров (нужен `manage.py createcachetable`);
+#   redis    — общий сервер, адрес в QUOTES_CACHE_LOCATION (нужен пакет redis).
+
+QUOTES_CACHE_BACKEND = os.getenv("QUOTES_CACHE_BACKEND", "locmem")
+
+_CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "quotes",
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("QUOTES_CACHE_LOCATION", str(BASE_DIR / ".cache")),
+    },
+    "database": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": os.getenv("QUOTES_CACHE_LOCATION", "quotes_cache"),
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("QUOTES_CACHE_LOCATION", "redis://127.0.0.1:6379"),
+    },
+}
+
+CACHES = {
+    "default": {
+        **_CACHE_BACKENDS[QUOTES_CACHE_BACKEND],
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 10000} if QUOTES_CACHE_BACKEND != "redis" else {},
     }
 }
 
 
+# Logging
+# Ошибки запросов (500) пишем в stderr и при DEBUG=False — по ним, в том числе,
+# loadtest считает «database is locked».
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "stderr": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "django.request": {"handlers": ["stderr"], "level": "ERROR"},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -125,6 +190,40 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# collectstatic кладёт файлы с хэшем в имени и их .gz/.br копии;
+# отдаёт их quotes.middleware.StaticFilesMiddleware
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "quotes.storage.CompressedManifestStaticFilesStorage"},
+}
+QUOTES_STATIC_MAX_AGE = 3600
+QUOTES_STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# HTML короче порога не сжимаем: выигрыш меньше накладных расходов gzip
+QUOTES_GZIP_MIN_LENGTH = int(os.getenv("QUOTES_GZIP_MIN_LENGTH", "1024"))
+
+# HTTP-кэширование страниц (quotes.http_cache.conditional_page).
+# Ключ — имя URL, значение — аргументы django.utils.cache.patch_cache_control.
+# Для авторизованных пользователей public всегда заменяется на private.
+QUOTES_CACHE_CONTROL = {
+    "default": {"private": True, "no_cache": True},
+    "quotes:top": {"public": True, "max_age": int(os.getenv("QUOTES_TOP_MAX_AGE", "30"))},
+    "quotes:source_suggest": {"public": True, "max_age": 60},
+    "quotes:moderation_queue": {"private": True, "no_cache": True},
+    "quotes:moderation_users": {"private": True, "no_cache": True},
+}
+
+# Хранение ModerationLog: старше срока — в архив (manage.py archive_moderation_logs)
+QUOTES_MODERATION_LOG_RETENTION_DAYS = int(os.getenv("QUOTES_MODERATION_LOG_RETENTION_DAYS", "180"))
+QUOTES_ARCHIVE_DIR = Path(os.getenv("QUOTES_ARCHIVE_DIR", BASE_DIR / "archive"))
+
+# Снимок утверждённых цитат для главной (manage.py build_snapshot, задача rebuild_snapshot)
+QUOTES_SNAPSHOT_PATH = Path(os.getenv("QUOTES_SNAPSHOT_PATH", BASE_DIR / "catalogue.snap"))
+
+# Профилирование запросов модератором (?__profile=1): каталог и размер кольцевого буфера
+QUOTES_PROFILE_DIR = Path(os.getenv("QUOTES_PROFILE_DIR", BASE_DIR / "profiles"))
+QUOTES_PROFILE_KEEP = 50
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 